@@ -0,0 +1 @@
+from .match_analytics import MatchAnalytics, parquet_available, PARQUET_MISSING
\ No newline at end of file
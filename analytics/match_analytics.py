@@ -0,0 +1,162 @@
+import importlib.util
+import math
+from collections import deque
+
+import numpy as np
+
+PARQUET_MISSING = "Parquet output needs pandas and pyarrow: pip install pandas pyarrow"
+
+
+def parquet_available():
+    """Whether to_parquet() can run, checked without importing pandas"""
+    return all(importlib.util.find_spec(name) is not None for name in ("pandas", "pyarrow"))
+
+
+class MatchAnalytics:
+    """Per-player totals and a down-sampled time series, collected frame by frame
+
+    Memory grows with the number of players and intervals, not frames: each
+    interval (interval_seconds long) keeps one row per player seen in it,
+    holding the mean speed and the latest cumulative distance. With
+    max_intervals (live streams, which never end) only the latest that many
+    intervals of the series are kept; the totals still cover the whole run.
+    """
+
+    def __init__(self, fps, interval_seconds=1.0, max_intervals=None):
+        self.fps = fps if fps > 0 else 24
+        self.interval_seconds = interval_seconds
+        self.interval_frames = max(1, int(round(self.fps * interval_seconds)))
+        self.max_intervals = max_intervals
+        self.frames = 0
+        self.possession_frames = 0
+        self.players = {}
+        # One list of player rows per closed interval
+        self._player_intervals = deque(maxlen=max_intervals)
+        self.possession_series = deque(maxlen=max_intervals)
+        self._interval = {}
+        self._possession_counts = {}
+        self._possession_open = False
+
+    @property
+    def player_series(self):
+        return [row for rows in self._player_intervals for row in rows]
+
+    def _interval_start(self, frame_num):
+        return round(frame_num // self.interval_frames * self.interval_seconds, 3)
+
+    def add_frame(self, track_ids, teams, speeds, distances):
+        """One frame of player columns: ids, team labels, speeds (km/h) and cumulative distances (m)
+
+        Team 0 means not assigned yet; it is left out of the team counts.
+        """
+        if self.frames % self.interval_frames == 0 and self.frames > 0:
+            self._close_interval(self.frames - 1)
+        for track_id, team, speed, distance in zip(track_ids, teams, speeds, distances):
+            track_id, team, speed, distance = int(track_id), int(team), float(speed), float(distance)
+            totals = self.players.get(track_id)
+            if totals is None:
+                totals = {"teams": {}, "frames": 0, "distance": 0.0,
+                          "speed_sum": 0.0, "speed_count": 0, "max_speed": 0.0}
+                self.players[track_id] = totals
+            totals["frames"] += 1
+
+            row = self._interval.get(track_id)
+            if row is None:
+                row = self._interval[track_id] = [None, 0.0, 0, None]
+            if team:
+                totals["teams"][team] = totals["teams"].get(team, 0) + 1
+                row[0] = team
+            if not math.isnan(distance):
+                totals["distance"] = row[3] = distance
+            if not math.isnan(speed):
+                totals["speed_sum"] += speed
+                totals["speed_count"] += 1
+                totals["max_speed"] = max(totals["max_speed"], speed)
+                row[1] += speed
+                row[2] += 1
+        self.frames += 1
+
+    def add_possession(self, team):
+        """The team in possession for the next frame (frames arrive in order); None if unknown"""
+        if self.possession_frames % self.interval_frames == 0 and self.possession_frames > 0:
+            self._close_possession(self.possession_frames - 1)
+        if team:
+            self._possession_counts[team] = self._possession_counts.get(team, 0) + 1
+        self._possession_open = True
+        self.possession_frames += 1
+
+    def _close_interval(self, frame_num):
+        t = self._interval_start(frame_num)
+        self._player_intervals.append([
+            {
+                "t": t,
+                "track_id": track_id,
+                "team": team,
+                "speed_kmh": round(speed_sum / speed_count, 2) if speed_count else None,
+                "distance_m": round(distance, 2) if distance is not None else None,
+            }
+            for track_id, (team, speed_sum, speed_count, distance) in self._interval.items()
+        ])
+        self._interval = {}
+
+    def _close_possession(self, frame_num):
+        total = sum(self._possession_counts.values())
+        self.possession_series.append({
+            "t": self._interval_start(frame_num),
+            "possession": {str(team): round(count / total * 100, 2)
+                           for team, count in sorted(self._possession_counts.items())},
+        })
+        self._possession_counts = {}
+        self._possession_open = False
+
+    def finish(self):
+        """Close the trailing partial interval"""
+        if self._interval:
+            self._close_interval(self.frames - 1)
+        if self._possession_open:
+            self._close_possession(self.possession_frames - 1)
+
+    def player_totals(self):
+        return {
+            str(track_id): {
+                "team": max(totals["teams"], key=totals["teams"].get) if totals["teams"] else None,
+                "frames": totals["frames"],
+                "distance_m": round(totals["distance"], 2),
+                "max_speed_kmh": round(totals["max_speed"], 2),
+                "avg_speed_kmh": (round(totals["speed_sum"] / totals["speed_count"], 2)
+                                  if totals["speed_count"] else None),
+            }
+            for track_id, totals in sorted(self.players.items())
+        }
+
+    def as_dict(self):
+        return {
+            "fps": self.fps,
+            "frames": self.frames,
+            "interval_seconds": self.interval_seconds,
+            "max_intervals": self.max_intervals,
+            "players": self.player_totals(),
+            "player_series": self.player_series,
+            "possession_series": list(self.possession_series),
+        }
+
+    def to_parquet(self, path):
+        """Write the time series as one long table: a row per (interval, player)
+
+        Possession shares are joined on as possession_<team> columns, so
+        intervals without any player still get a row. Needs pandas and
+        pyarrow (optional dependencies).
+        """
+        if not parquet_available():
+            raise ImportError(PARQUET_MISSING)
+        import pandas as pd
+
+        players = pd.DataFrame(self.player_series, columns=["t", "track_id", "team", "speed_kmh", "distance_m"])
+        possession = pd.DataFrame([
+            dict({"t": row["t"]}, **{f"possession_{team}": share for team, share in row["possession"].items()})
+            for row in self.possession_series
+        ], columns=None if self.possession_series else ["t"])
+        table = players.merge(possession, on="t", how="outer").sort_values(["t", "track_id"])
+        table = table.astype({"speed_kmh": np.float32, "distance_m": np.float32})
+        table.to_parquet(path, index=False)
+        return path
@@ -0,0 +1,107 @@
+"""Measure box accuracy when detection skips frames and BoxPropagator fills the gaps.
+
+The detector is simulated (ground truth plus pixel noise), so this isolates
+the motion model; throughput scales with the detection rate since YOLO
+dominates per-frame cost. Run from the repository root:
+
+    python -m benchmarks.bench_frame_skip --players 22 --frames 300 --intervals 1 2 3 5
+"""
+import argparse
+import json
+
+import numpy as np
+
+from trackers.box_propagation import BoxPropagator
+
+
+def make_trajectories(num_players, num_frames, rng, size=(640, 360)):
+    """(frames, players, 4) boxes: smooth player motion plus a panning camera"""
+    width, height = size
+    positions = rng.uniform((40, 60), (width - 40, height - 20), size=(num_players, 2))
+    velocities = rng.normal(0, 1.0, size=(num_players, 2))
+    box_sizes = rng.uniform((12, 28), (18, 40), size=(num_players, 2))
+    pan = 3.0 * np.sin(np.arange(num_frames) / 40.0)
+
+    boxes = np.empty((num_frames, num_players, 4), dtype=np.float32)
+    for frame in range(num_frames):
+        velocities = 0.95 * velocities + rng.normal(0, 0.25, size=velocities.shape)
+        positions += velocities
+        positions[:, 0] -= pan[frame]
+        boxes[frame, :, :2] = positions - box_sizes / 2
+        boxes[frame, :, 2:] = positions + box_sizes / 2
+    return boxes
+
+
+def iou(a, b):
+    x1 = np.maximum(a[:, 0], b[:, 0])
+    y1 = np.maximum(a[:, 1], b[:, 1])
+    x2 = np.minimum(a[:, 2], b[:, 2])
+    y2 = np.minimum(a[:, 3], b[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a + area_b - inter)
+
+
+def simulate(truth, detect_every, rng, adaptive=False, drift_threshold=0.5, noise=1.0):
+    propagator = BoxPropagator()
+    track_ids = np.arange(truth.shape[1])
+    class_ids = np.zeros(truth.shape[1], dtype=np.int8)
+    ious, detected, since = [], 0, None
+    for frame, boxes in enumerate(truth):
+        detect = since is None or since + 1 >= detect_every
+        if not detect and adaptive:
+            detect = propagator.drift(since + 1) > drift_threshold
+        if detect:
+            observed = boxes + rng.normal(0, noise, size=boxes.shape).astype(np.float32)
+            propagator.observe(frame, track_ids, class_ids, observed)
+            predicted = observed
+            detected += 1
+            since = 0
+        else:
+            predicted = propagator.predict(frame)[2]
+            since += 1
+        ious.append(iou(predicted, boxes))
+    ious = np.concatenate(ious)
+    return {
+        "detect_every": detect_every,
+        "adaptive": adaptive,
+        "detection_rate": round(detected / len(truth), 4),
+        "mean_iou": round(float(ious.mean()), 4),
+        "iou_below_0.5": round(float((ious < 0.5).mean()), 4),
+    }
+
+
+def run(num_players, num_frames, intervals, seed):
+    truth = make_trajectories(num_players, num_frames, np.random.default_rng(seed))
+    results = []
+    for detect_every in intervals:
+        results.append(simulate(truth, detect_every, np.random.default_rng(seed + 1)))
+        if detect_every > 1:
+            results.append(simulate(truth, detect_every, np.random.default_rng(seed + 1), adaptive=True))
+    baseline = results[0]["mean_iou"]
+    for result in results:
+        result["iou_loss"] = round(baseline - result["mean_iou"], 4)
+        result["expected_speedup"] = round(1 / result["detection_rate"], 2)
+    return {"players": num_players, "frames": num_frames, "runs": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--intervals", type=int, nargs="+", default=[1, 2, 3, 5])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    result = run(args.players, args.frames, args.intervals, args.seed)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for run_result in result["runs"]:
+            print("  ".join(f"{key}={value}" for key, value in run_result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark batched jersey-color extraction against per-crop KMeans.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_team_colors --players 22 --frames 20
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+from team_assigner import TeamAssigner
+
+TEAM_JERSEYS = [(40, 40, 200), (235, 235, 235)]  # BGR: red, white
+GRASS = (60, 140, 60)
+
+
+def make_frame(num_players, rng, size=(640, 360)):
+    """Synthetic pitch with num_players two-tone players; returns frame, bboxes, teams"""
+    width, height = size
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = GRASS
+    noise = rng.integers(-12, 13, size=frame.shape)
+    frame = np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    bboxes, teams = [], []
+    for i in range(num_players):
+        team = i % 2
+        w, h = rng.integers(12, 24), rng.integers(30, 55)
+        x1, y1 = rng.integers(0, width - w), rng.integers(0, height - h)
+        jersey = np.clip(np.array(TEAM_JERSEYS[team]) + rng.integers(-15, 16, 3), 0, 255)
+        # Player silhouette is narrower than the box, so corners stay grass
+        inset = max(2, w // 5)
+        frame[y1 + 2:y1 + h // 2, x1 + inset:x1 + w - inset] = jersey
+        frame[y1 + h // 2:y1 + h, x1 + inset:x1 + w - inset] = (20, 20, 20)
+        bboxes.append([float(x1), float(y1), float(x1 + w), float(y1 + h)])
+        teams.append(team + 1)
+    return frame, bboxes, np.array(teams)
+
+
+def label_agreement(labels_a, labels_b):
+    """Fraction of matching labels, up to swapping the two team ids"""
+    same = np.mean(labels_a == labels_b)
+    return max(same, 1 - same)
+
+
+def fit_teams(colors):
+    kmeans = KMeans(n_clusters=2, init='k-means++', n_init=10, random_state=0)
+    return kmeans.fit_predict(colors) + 1
+
+
+def run(num_players, num_frames, seed):
+    rng = np.random.default_rng(seed)
+    assigner = TeamAssigner()
+    frames = [make_frame(num_players, rng) for _ in range(num_frames)]
+
+    # Warm up both paths (imports, BLAS threads)
+    assigner.get_player_color(frames[0][0], frames[0][1][0])
+    assigner.get_player_colors(frames[0][0], frames[0][1])
+
+    t0 = time.perf_counter()
+    legacy = [np.array([assigner.get_player_color(frame, bbox) for bbox in bboxes])
+              for frame, bboxes, _ in frames]
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batched = [assigner.get_player_colors(frame, bboxes) for frame, bboxes, _ in frames]
+    batched_s = time.perf_counter() - t0
+
+    agreement, truth_legacy, truth_batched = [], [], []
+    for (_, _, teams), old, new in zip(frames, legacy, batched):
+        old_labels, new_labels = fit_teams(old), fit_teams(new)
+        agreement.append(label_agreement(old_labels, new_labels))
+        truth_legacy.append(label_agreement(old_labels, teams))
+        truth_batched.append(label_agreement(new_labels, teams))
+
+    crops = num_players * num_frames
+    return {
+        "players": num_players,
+        "frames": num_frames,
+        "legacy_ms_per_crop": round(legacy_s / crops * 1000, 4),
+        "batched_ms_per_crop": round(batched_s / crops * 1000, 4),
+        "speedup": round(legacy_s / batched_s, 1) if batched_s > 0 else None,
+        "team_label_agreement": round(float(np.mean(agreement)), 4),
+        "legacy_accuracy": round(float(np.mean(truth_legacy)), 4),
+        "batched_accuracy": round(float(np.mean(truth_batched)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    result = run(args.players, args.frames, args.seed)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            print(f"{key:>22}: {value}")
+
+
+if __name__ == "__main__":
+    main()
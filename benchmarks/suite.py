@@ -0,0 +1,225 @@
+"""Offline benchmark suite: every pipeline stage on synthetic clips, checked against a baseline.
+
+Needs no model weights or GPU (see benchmarks/synthetic.py). Run from the
+repository root:
+
+    python -m benchmarks.suite                   # run and compare with benchmarks/baseline.json
+    python -m benchmarks.suite --output out.json # also write the results
+    python -m benchmarks.suite --save-baseline   # accept the current numbers as the baseline
+    python -m benchmarks.suite --quick           # smaller grid, for a fast check
+
+Exits with status 1 if any benchmark is slower than its baseline by more
+than --tolerance. Stages whose dependencies are missing are reported as
+skipped rather than failing the run.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SyntheticMatch, FakeDetector
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def visible_players(match, frame_num):
+    """(track_ids, bboxes) of players inside the frame"""
+    bboxes = match.player_bboxes(frame_num)
+    inside = (bboxes[:, 2] > 0) & (bboxes[:, 0] < match.frame_size[0])
+    return np.flatnonzero(inside) + 1, bboxes[inside]
+
+
+def bench_team_assigner(match, frames):
+    from team_assigner import TeamAssigner
+    assigner = TeamAssigner()
+    t0 = time.perf_counter()
+    for frame_num, frame in enumerate(frames):
+        track_ids, bboxes = visible_players(match, frame_num)
+        assigner.update(frame, {int(tid): {"bbox": bbox.tolist()} for tid, bbox in zip(track_ids, bboxes)})
+    return time.perf_counter() - t0
+
+
+def bench_player_ball_assigner(match, frames):
+    from player_ball_assigner import PlayerBallAssigner
+    assigner = PlayerBallAssigner(switch_margin=10, min_switch_frames=3)
+    inputs = [visible_players(match, n) + (match.ball_bbox(n),) for n in range(len(frames))]
+    t0 = time.perf_counter()
+    for track_ids, bboxes, ball_bbox in inputs:
+        assigner.update_owner(track_ids, bboxes, ball_bbox)
+    return time.perf_counter() - t0
+
+
+def bench_speed_and_distance(match, frames):
+    from speed_and_distance import SpeedAndDistance_Estimator
+    estimator = SpeedAndDistance_Estimator(frame_rate=25)
+    inputs = []
+    for frame_num in range(len(frames)):
+        track_ids, bboxes = visible_players(match, frame_num)
+        inputs.append((track_ids, (bboxes[:, :2] + bboxes[:, 2:]) / 2 * 0.1))
+    t0 = time.perf_counter()
+    for track_ids, positions in inputs:
+        estimator.update_frame(track_ids, positions)
+    return time.perf_counter() - t0
+
+
+def bench_camera_movement(match, frames):
+    from camera_movement import CameraMovement
+    camera = CameraMovement(frames[0])
+    t0 = time.perf_counter()
+    for frame in frames:
+        camera.update(frame)
+    return time.perf_counter() - t0
+
+
+def bench_draw_annotations(match, frames):
+    from trackers import Tracker
+    possession = [1 + (n // 40) % 2 for n in range(len(frames))]
+    tracks = [match.frame_tracks(n) for n in range(len(frames))]
+    t0 = time.perf_counter()
+    for frame_num, frame in enumerate(frames):
+        Tracker.draw_annotations([frame], tracks[frame_num], possession[:frame_num + 1])
+    return time.perf_counter() - t0
+
+
+def bench_end_to_end(match, frames, **options):
+    from main import process_video_optimized
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = match.write_video(os.path.join(tmp_dir, "input.avi"))
+        t0 = time.perf_counter()
+        result = process_video_optimized(input_path, os.path.join(tmp_dir, "output.avi"),
+                                         model=FakeDetector(), cache_dir=None, **options)
+        elapsed = time.perf_counter() - t0
+    if result.get("error"):
+        raise RuntimeError(result["error"])
+    return elapsed
+
+
+def bench_end_to_end_analytics(match, frames):
+    return bench_end_to_end(match, frames, analytics_only=True)
+
+
+BENCHMARKS = {
+    "team_assigner": bench_team_assigner,
+    "player_ball_assigner": bench_player_ball_assigner,
+    "speed_and_distance": bench_speed_and_distance,
+    "camera_movement": bench_camera_movement,
+    "draw_annotations": bench_draw_annotations,
+    "end_to_end": bench_end_to_end,
+    "end_to_end_analytics": bench_end_to_end_analytics,
+}
+
+
+def run(players_grid, frames_grid, repeat, seed, only=None):
+    results = {}
+    for num_frames in frames_grid:
+        for num_players in players_grid:
+            match = SyntheticMatch(num_players, num_frames, seed=seed)
+            frames = list(match.frames())
+            for name, bench in BENCHMARKS.items():
+                if only and name not in only:
+                    continue
+                key = f"{name}/players={num_players}/frames={num_frames}"
+                try:
+                    # Frames are copied per run: drawing and the pipeline write into them
+                    timings = [bench(match, [frame.copy() for frame in frames]) for _ in range(repeat)]
+                except ImportError as e:
+                    results[key] = {"skipped": str(e)}
+                    continue
+                seconds = float(np.median(timings))
+                results[key] = {
+                    "ms_per_frame": round(seconds / num_frames * 1000, 4),
+                    "fps": round(num_frames / seconds, 1) if seconds > 0 else None,
+                    "runs": repeat,
+                }
+                print(f"{key:<55} {results[key]['ms_per_frame']:>9.4f} ms/frame", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Per-benchmark ratio to the baseline; returns (rows, regressions)"""
+    rows, regressions = [], []
+    for key, result in results.items():
+        base = baseline.get(key, {})
+        if "ms_per_frame" not in result or "ms_per_frame" not in base:
+            rows.append((key, result.get("ms_per_frame"), base.get("ms_per_frame"), None, "n/a"))
+            continue
+        ratio = result["ms_per_frame"] / base["ms_per_frame"] if base["ms_per_frame"] > 0 else None
+        if ratio is not None and ratio > 1 + tolerance:
+            verdict = "SLOWER"
+            regressions.append(key)
+        elif ratio is not None and ratio < 1 - tolerance:
+            verdict = "faster"
+        else:
+            verdict = "ok"
+        rows.append((key, result["ms_per_frame"], base["ms_per_frame"], ratio, verdict))
+    return rows, regressions
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[10, 22])
+    parser.add_argument("--frames", type=int, nargs="+", default=[60, 240])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run just these stages")
+    parser.add_argument("--quick", action="store_true", help="22 players, 60 frames, 1 run")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a benchmark counts as a regression")
+    args = parser.parse_args()
+    if args.quick:
+        args.players, args.frames, args.repeat = [22], [60], 1
+
+    report = {
+        "environment": environment(),
+        "config": {"players": args.players, "frames": args.frames, "repeat": args.repeat, "seed": args.seed},
+        "results": run(args.players, args.frames, args.repeat, args.seed, only=args.only),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(json.dumps(report, indent=2))
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows, regressions = compare(report["results"], baseline["results"], args.tolerance)
+    print(f"{'benchmark':<55} {'ms/frame':>10} {'baseline':>10} {'ratio':>7}  verdict")
+    for key, current, base, ratio, verdict in rows:
+        fmt = lambda value, spec: format(value, spec) if value is not None else "-"
+        print(f"{key:<55} {fmt(current, '10.4f'):>10} {fmt(base, '10.4f'):>10} {fmt(ratio, '7.2f'):>7}  {verdict}")
+    if baseline.get("environment") != report["environment"]:
+        print("Note: baseline was recorded on a different environment:", baseline.get("environment"))
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Synthetic match clips and a fake detector, so benchmarks need no weights or GPU."""
+import cv2
+import numpy as np
+
+GRASS = (60, 140, 60)
+GRASS_TEXTURE = (40, 110, 40)
+TEAM_KITS = {1: (40, 40, 200), 2: (200, 60, 40)}  # BGR: red, blue
+SHORTS = (20, 20, 20)
+BALL = (245, 245, 245)
+
+PERSON_CLASS, BALL_CLASS = 0, 32
+CLASS_NAMES = {PERSON_CLASS: "person", BALL_CLASS: "sports ball"}
+
+
+class SyntheticMatch:
+    """Moving two-tone players and a ball on a textured, panning pitch
+
+    Everything is deterministic for a given seed. Players live in pitch
+    coordinates; the camera pans across a pitch wider than the frame, so
+    CameraMovement has real texture to follow.
+    """
+
+    def __init__(self, num_players=22, num_frames=100, seed=0, frame_size=(640, 360)):
+        self.num_players = num_players
+        self.num_frames = num_frames
+        self.frame_size = frame_size
+        rng = np.random.default_rng(seed)
+        width, height = frame_size
+        self.pitch_width = width + 400
+
+        self.pitch = np.empty((height, self.pitch_width, 3), dtype=np.uint8)
+        self.pitch[:] = GRASS
+        for x, y in zip(rng.integers(0, self.pitch_width - 6, 1500), rng.integers(0, height - 6, 1500)):
+            self.pitch[y:y + 5, x:x + 5] = GRASS_TEXTURE
+
+        self.pan = 200 + 150 * np.sin(np.arange(num_frames) / 50.0)
+        self.teams = np.array([1 + i % 2 for i in range(num_players)])
+        self.sizes = rng.uniform((10, 24), (14, 34), size=(num_players, 2))
+
+        positions = np.empty((num_frames, num_players, 2))
+        position = rng.uniform((40, 60), (self.pitch_width - 40, height - 30), size=(num_players, 2))
+        velocity = rng.normal(0, 1.0, size=(num_players, 2))
+        for frame in range(num_frames):
+            velocity = 0.95 * velocity + rng.normal(0, 0.3, size=velocity.shape)
+            position = np.clip(position + velocity, (20, 40), (self.pitch_width - 20, height - 20))
+            positions[frame] = position
+        self.positions = positions
+
+        # The ball drifts from one player's feet to another's
+        ball = np.empty((num_frames, 2))
+        carrier = 0
+        for frame in range(num_frames):
+            if frame % 40 == 0:
+                carrier = int(rng.integers(num_players)) if num_players else 0
+            target = (positions[frame, carrier] + (0, self.sizes[carrier, 1] / 2 + 6)
+                      if num_players else (width / 2, height / 2))
+            ball[frame] = target if frame == 0 else ball[frame - 1] + 0.3 * (target - ball[frame - 1])
+        self.ball = ball
+
+    def player_bboxes(self, frame_num):
+        """(num_players, 4) xyxy boxes in frame coordinates"""
+        center = self.positions[frame_num] - (self.pan[frame_num], 0)
+        half = self.sizes / 2
+        return np.hstack([center - half, center + half])
+
+    def ball_bbox(self, frame_num):
+        x, y = self.ball[frame_num] - (self.pan[frame_num], 0)
+        return np.array([x - 3, y - 3, x + 3, y + 3])
+
+    def frame(self, frame_num):
+        width, height = self.frame_size
+        x0 = int(self.pan[frame_num])
+        frame = self.pitch[:, x0:x0 + width].copy()
+        for (x1, y1, x2, y2), team in zip(self.player_bboxes(frame_num).astype(int), self.teams):
+            mid = (y1 + y2) // 2
+            cv2.rectangle(frame, (x1, y1), (x2, mid), TEAM_KITS[team], -1)
+            cv2.rectangle(frame, (x1, mid), (x2, y2), SHORTS, -1)
+        x, y = (self.ball[frame_num] - (self.pan[frame_num], 0)).astype(int)
+        cv2.circle(frame, (int(x), int(y)), 3, BALL, -1)
+        return frame
+
+    def frames(self):
+        for frame_num in range(self.num_frames):
+            yield self.frame(frame_num)
+
+    def frame_tracks(self, frame_num):
+        """Ground truth in the single-frame dict shape the drawing stages use"""
+        players = {
+            i + 1: {"bbox": bbox.tolist(), "team": int(team), "team_color": TEAM_KITS[team],
+                    "speed": 12.5, "distance": 40.0}
+            for i, (bbox, team) in enumerate(zip(self.player_bboxes(frame_num), self.teams))
+        }
+        return {"players": [players], "referees": [{}], "ball": [{1: {"bbox": self.ball_bbox(frame_num).tolist()}}]}
+
+    def write_video(self, path, fps=25):
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"XVID"), fps, self.frame_size)
+        for frame in self.frames():
+            out.write(frame)
+        out.release()
+        return path
+
+
+class _Tensor:
+    """Just enough of a torch tensor for supervision's from_ultralytics()"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+    def int(self):
+        return _Tensor(self.array.astype(int))
+
+    def __len__(self):
+        return len(self.array)
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = _Tensor(xyxy.astype(np.float32))
+        self.conf = _Tensor(conf.astype(np.float32))
+        self.cls = _Tensor(cls.astype(np.float32))
+        self.id = None
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.names = CLASS_NAMES
+        self.masks = None
+        self.obb = None
+
+
+class FakeDetector:
+    """Stands in for a YOLO model: finds players and ball by colour
+
+    Anything far from grass green is foreground; connected blobs become
+    "person" boxes and small ones the "sports ball". Works on frames that
+    went through a lossy video codec and costs a few milliseconds.
+    """
+
+    def __init__(self, threshold=110, ball_max_area=60):
+        self.threshold = threshold
+        self.ball_max_area = ball_max_area
+
+    def _detect(self, frame):
+        distance = cv2.absdiff(frame, np.full_like(frame, GRASS)).sum(axis=2)
+        mask = (distance > self.threshold).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        stats = stats[1:]
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= 6]
+        x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+        xyxy = np.stack([x, y, x + w, y + h], axis=1).astype(np.float32)
+        is_ball = stats[:, cv2.CC_STAT_AREA] <= self.ball_max_area
+        cls = np.where(is_ball, BALL_CLASS, PERSON_CLASS)
+        conf = np.full(len(cls), 0.9)
+        return _Result(_Boxes(xyxy.reshape(-1, 4), conf, cls))
+
+    def predict(self, frames, conf=0.25, verbose=False, **kwargs):
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+        return [self._detect(frame) for frame in frames]
@@ -1,10 +1,15 @@
 import cv2
 import numpy as np
-import pickle
+
+from trackers.track_io import save_camera_movement, load_camera_movement
 
 class CameraMovement:
-    def __init__(self, frame):
-        self.min_distance = 5
+    def __init__(self, frame, downscale=0.5, min_features=10, method="median"):
+        # Motion is estimated on a downscaled grey frame; shifts are reported
+        # in full-resolution pixels
+        self.downscale = downscale
+        self.min_features = min_features
+        self.method = method
         
         # Parameters for corner detection
         self.lk_params = dict(
@@ -13,10 +18,11 @@ class CameraMovement:
             criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
         )
         
-        first_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        first_gray = self.prepare_gray(frame)
+        border = max(1, int(round(20 * downscale)))
         mask = np.zeros_like(first_gray)
-        mask[:, 0:20] = 1
-        mask[:, frame.shape[1]-20:] = 1
+        mask[:, 0:border] = 1
+        mask[:, first_gray.shape[1]-border:] = 1
         
         self.features = dict(
             maxCorners=100,
@@ -25,65 +31,91 @@ class CameraMovement:
             blockSize=7,
             mask=mask
         )
+        
+        # Streaming state carried between calls
+        self.old_gray = None
+        self.old_features = None
+        self.total_movement = np.zeros(2)
+    
+    def prepare_gray(self, frame):
+        """Grey, downscaled copy of a BGR frame as used by update()"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.downscale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.downscale, fy=self.downscale,
+                              interpolation=cv2.INTER_AREA)
+        return gray
     
-    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None):
-        """Calculate camera movement between frames"""
+    def _estimate_shift(self, old_points, new_points):
+        displacement = new_points - old_points
+        if self.method == "ransac" and len(old_points) >= 3:
+            matrix, _ = cv2.estimateAffinePartial2D(
+                old_points, new_points, method=cv2.RANSAC, ransacReprojThreshold=1.0
+            )
+            if matrix is not None:
+                return matrix[:, 2]
+        return np.median(displacement, axis=0)
+    
+    def update(self, frame=None, gray=None):
+        """Camera movement [x, y] of this frame relative to the previous one
         
-        if read_from_stub and stub_path:
-            try:
-                with open(stub_path, 'rb') as f:
-                    return pickle.load(f)
-            except:
-                pass
+        Pass either a BGR frame or a grey frame already produced by
+        prepare_gray(). The first frame seen returns [0, 0].
+        """
+        frame_gray = gray if gray is not None else self.prepare_gray(frame)
+        movement = [0, 0]
+        
+        if self.old_gray is not None and self.old_features is not None and len(self.old_features) > 0:
+            new_features, status, _ = cv2.calcOpticalFlowPyrLK(
+                self.old_gray, frame_gray, self.old_features, None, **self.lk_params
+            )
+            if new_features is not None:
+                tracked = status.ravel() == 1
+                old_points = self.old_features.reshape(-1, 2)[tracked]
+                new_points = new_features.reshape(-1, 2)[tracked]
+                
+                if len(new_points) > 0:
+                    shift = self._estimate_shift(old_points, new_points) / self.downscale
+                    movement = [float(shift[0]), float(shift[1])]
+                
+                # Keep following surviving features; re-detect only when too few remain
+                self.old_features = new_points.reshape(-1, 1, 2) if len(new_points) >= self.min_features else None
+        
+        if self.old_features is None or len(self.old_features) < self.min_features:
+            self.old_features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
         
-        frame_list = list(frames)
-        if not frame_list:
-            return []
+        self.old_gray = frame_gray
+        self.total_movement += movement
+        return movement
+    
+    def record_movement(self, movement):
+        """Account for a movement computed elsewhere (e.g. read from a cache)"""
+        self.total_movement += movement
+        return movement
+    
+    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None, frame_range=None):
+        """Calculate camera movement between frames
         
-        camera_movement = [[0, 0]] * len(frame_list)
+        State is kept between calls, so frames may be streamed in one at a
+        time; each entry is relative to the frame before it. Stubs use the
+        versioned format in trackers.track_io (frame_range=(start, end) for a
+        partial load).
+        """
         
-        old_gray = cv2.cvtColor(frame_list[0], cv2.COLOR_BGR2GRAY)
-        old_features = cv2.goodFeaturesToTrack(old_gray, **self.features)
+        if read_from_stub and stub_path:
+            try:
+                start, end = frame_range or (None, None)
+                return load_camera_movement(stub_path, start, end)
+            except FileNotFoundError:
+                pass
         
-        for frame_num in range(1, len(frame_list)):
-            frame_gray = cv2.cvtColor(frame_list[frame_num], cv2.COLOR_BGR2GRAY)
-            
-            if old_features is not None and len(old_features) > 0:
-                new_features, status, error = cv2.calcOpticalFlowPyrLK(
-                    old_gray, frame_gray, old_features, None, **self.lk_params,
-                    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
-                )
-                
-                if new_features is not None:
-                    # Calculate movement
-                    max_distance = 0
-                    camera_movement_x, camera_movement_y = 0, 0
-                    
-                    for i, (new, old) in enumerate(zip(new_features, old_features)):
-                        if status[i]:
-                            new_pos = new.ravel()
-                            old_pos = old.ravel()
-                            
-                            distance = np.linalg.norm(new_pos - old_pos)
-                            
-                            if distance > max_distance:
-                                max_distance = distance
-                                camera_movement_x = new_pos[0] - old_pos[0]
-                                camera_movement_y = new_pos[1] - old_pos[1]
-                    
-                    if max_distance > self.min_distance:
-                        camera_movement[frame_num] = [camera_movement_x, camera_movement_y]
-                        old_features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
-                    
-                    old_gray = frame_gray.copy()
+        camera_movement = [self.update(frame) for frame in frames]
         
         if stub_path:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(camera_movement, f)
+            save_camera_movement(stub_path, camera_movement)
         
         return camera_movement
     
-    def adjust__tracks_positions(self, tracks, camera_movement):
+    def adjust_tracks_positions(self, tracks, camera_movement):
         """Adjust track positions based on camera movement"""
         for object_type, object_tracks in tracks.items():
             for frame_num, frame_tracks in enumerate(object_tracks):
@@ -98,6 +130,9 @@ class CameraMovement:
                     
                     tracks[object_type][frame_num][track_id]["position_adjusted"] = adjusted_position
     
+    # Old misspelt name, kept for callers that still use it
+    adjust__tracks_positions = adjust_tracks_positions
+    
     def adjust_single_frame_tracks(self, tracks, frame_num, camera_adjustment):
         """Adjust track positions for a single frame"""
         for object_type, object_tracks in tracks.items():
@@ -110,17 +145,18 @@ class CameraMovement:
                     )
                     tracks[object_type][frame_num][track_id]["position_adjusted"] = adjusted_position
 
-    def draw_camera_movement(self, frames, camera_movement):
-        """Draw camera movement on frames"""
+    def draw_camera_movement(self, frames, camera_movement, in_place=False):
+        """Draw camera movement on frames (in_place=True draws on the given frames)"""
         output_frames = []
         
         for frame_num, frame in enumerate(frames):
-            frame = frame.copy()
+            if not in_place:
+                frame = frame.copy()
             
-            overlay = frame.copy()
-            cv2.rectangle(overlay, (0, 0), (500, 100), (255, 255, 255), -1)
+            # Blend the white panel into its region only: x * (1 - alpha) + 255 * alpha
             alpha = 0.6
-            frame = cv2.addWeighted(overlay, alpha, frame, 1-alpha, 0)
+            panel = frame[0:101, 0:501]
+            cv2.convertScaleAbs(panel, dst=panel, alpha=1 - alpha, beta=255 * alpha)
             
             x_movement, y_movement = camera_movement[frame_num]
             
@@ -0,0 +1 @@
+from .detection_cache import DetectionCache, hash_file
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+from trackers.track_io import save_track_columns, load_track_columns
+
+CACHE_FORMAT_VERSION = 3  # 3: camera shifts stored as float64
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CachedDetections:
+    """Lazy, chunk-at-a-time reader for one cached clip
+
+    Chunks are memory-mapped, so frame() returns views into the page cache
+    rather than copies.
+    """
+
+    def __init__(self, entry_dir, meta):
+        self.entry_dir = entry_dir
+        self.meta = meta
+        self.num_frames = meta["num_frames"]
+        self.chunk_frames = meta["chunk_frames"]
+        self._chunk_index = None
+        self._chunk = None
+
+    def _load_chunk(self, chunk_index):
+        if chunk_index != self._chunk_index:
+            path = os.path.join(self.entry_dir, f"chunk_{chunk_index:05d}")
+            offsets, columns, camera_movement, _ = load_track_columns(path)
+            self._chunk = dict(columns, frame_offsets=offsets, camera_movement=camera_movement)
+            self._chunk_index = chunk_index
+        return self._chunk
+
+    def frame(self, frame_num):
+        """(track_ids, class_ids, bboxes, camera_movement) for one frame"""
+        if frame_num < 0 or frame_num >= self.num_frames:
+            raise IndexError(f"Frame {frame_num} not in cache ({self.num_frames} frames)")
+        chunk = self._load_chunk(frame_num // self.chunk_frames)
+        local = frame_num % self.chunk_frames
+        rows = slice(chunk["frame_offsets"][local], chunk["frame_offsets"][local + 1])
+        return (chunk["track_id"][rows], chunk["class_id"][rows], chunk["bbox"][rows],
+                chunk["camera_movement"][local].tolist())
+
+
+class DetectionCacheWriter:
+    """Collect per-frame tracks and camera shifts and write them in chunks
+
+    Everything goes to a private temporary directory that is renamed into
+    place on commit(), so readers never see a half-written entry.
+    """
+
+    def __init__(self, cache, key, chunk_frames):
+        self.cache = cache
+        self.key = key
+        self.chunk_frames = chunk_frames
+        self.tmp_dir = os.path.join(cache.cache_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+        os.makedirs(self.tmp_dir)
+        self.num_frames = 0
+        self.num_chunks = 0
+        self._reset_chunk()
+
+    def _reset_chunk(self):
+        self._track_ids, self._class_ids, self._bboxes = [], [], []
+        self._offsets = [0]
+        self._movements = []
+
+    def add_frame(self, track_ids, class_ids, bboxes, camera_movement):
+        # Copies: callers pass views into buffers they reuse for the next batch
+        self._track_ids.append(np.array(track_ids, dtype=np.int32, copy=True))
+        self._class_ids.append(np.array(class_ids, dtype=np.int8, copy=True))
+        self._bboxes.append(np.array(bboxes, dtype=np.float32, copy=True).reshape(-1, 4))
+        self._offsets.append(self._offsets[-1] + len(self._bboxes[-1]))
+        self._movements.append(np.array(camera_movement, dtype=np.float64, copy=True))
+        self.num_frames += 1
+        if len(self._movements) == self.chunk_frames:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        if not self._movements:
+            return
+        path = os.path.join(self.tmp_dir, f"chunk_{self.num_chunks:05d}")
+        save_track_columns(
+            path,
+            self._offsets,
+            {
+                "track_id": np.concatenate(self._track_ids),
+                "class_id": np.concatenate(self._class_ids),
+                "bbox": np.concatenate(self._bboxes),
+            },
+            camera_movement=self._movements,
+            first_frame=self.num_chunks * self.chunk_frames,
+        )
+        self.num_chunks += 1
+        self._reset_chunk()
+
+    def commit(self, extra_meta=None):
+        """Finish the entry and publish it to the cache"""
+        self._write_chunk()
+        meta = {
+            "version": CACHE_FORMAT_VERSION,
+            "key": self.key,
+            "num_frames": self.num_frames,
+            "chunk_frames": self.chunk_frames,
+            "num_chunks": self.num_chunks,
+            "created_at": time.time(),
+        }
+        meta.update(extra_meta or {})
+        with open(os.path.join(self.tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        final_dir = os.path.join(self.cache.cache_dir, self.key)
+        try:
+            os.rename(self.tmp_dir, final_dir)
+        except OSError:
+            # Another job published the same clip first
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.cache.evict()
+
+    def abort(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class DetectionCache:
+    """Content-addressed on-disk cache of per-frame tracks and camera shifts
+
+    Entries are keyed by the SHA-256 of the input file plus the detection
+    settings, so re-running analytics on a known clip skips inference.
+    Least recently used entries are evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3, chunk_frames=256):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.chunk_frames = chunk_frames
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, input_path, settings):
+        """Cache key for a clip processed with the given detection settings"""
+        settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+        return f"{hash_file(input_path)[:40]}-{settings_hash[:12]}"
+
+    def open(self, key):
+        """Reader for a complete entry, or None on a miss"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry_dir, "meta.json")
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != CACHE_FORMAT_VERSION:
+            return None
+        os.utime(meta_path)  # mark as recently used for LRU eviction
+        return CachedDetections(entry_dir, meta)
+
+    def writer(self, key):
+        return DetectionCacheWriter(self, key, self.chunk_frames)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry_dir, "meta.json")
+            if name.startswith(".") or not os.path.isfile(meta_path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(root, file_name))
+                for root, _, file_names in os.walk(entry_dir)
+                for file_name in file_names
+            )
+            entries.append((os.path.getmtime(meta_path), size, entry_dir))
+        return entries
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
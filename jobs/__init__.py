@@ -0,0 +1 @@
+from .job_manager import JobManager, JobQueueFull, save_stream
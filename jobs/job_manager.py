@@ -0,0 +1,212 @@
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+def save_stream(stream, path, chunk_size=1 << 20, max_bytes=None):
+    """Copy a file-like stream to disk in fixed-size chunks; returns bytes written
+
+    Raises ValueError once max_bytes is exceeded (the partial file is removed).
+    """
+    written = 0
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise ValueError(f"Upload exceeds {max_bytes} bytes")
+                f.write(chunk)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
+
+
+def set_torch_threads(threads):
+    """Size torch's intra-op thread pool, which is shared by every thread of the process"""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+class JobManager:
+    """Run tracking jobs on a bounded worker pool and keep their status
+
+    Every job gets its own working directory, so concurrent jobs never
+    share input or output files. At most max_workers jobs run at once and
+    at most max_queued more wait; beyond that reserve() raises JobQueueFull.
+    Each worker thread gets a fixed slot number and builds its model once
+    through model_factory(slot), reusing it for every job it runs. torch's
+    thread pool is process-wide, so it is sized once here to split the
+    cores between the workers (segment worker processes size their own).
+    """
+
+    def __init__(self, process_fn, work_dir, max_workers=None, max_queued=None,
+                 model_factory=None, default_options=None, result_ttl_seconds=3600):
+        self.process_fn = process_fn
+        self.work_dir = work_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queued = self.max_workers if max_queued is None else max_queued
+        self.model_factory = model_factory
+        self.default_options = default_options or {}
+        self.result_ttl_seconds = result_ttl_seconds
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queued)
+        self._local = threading.local()
+        self._slot_counter = itertools.count()
+        set_torch_threads(max(1, (os.cpu_count() or 1) // self.max_workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="tracking-worker",
+                                            initializer=self._init_worker)
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _init_worker(self):
+        with self._lock:
+            self._local.slot = next(self._slot_counter)
+
+    def _worker_model(self):
+        if self.model_factory is None:
+            return None
+        if getattr(self._local, "model", None) is None:
+            self._local.model = self.model_factory(self._local.slot)
+        return self._local.model
+
+    def reserve(self):
+        """Claim a pool slot and a working directory; returns (job_id, input_path, output_path)
+
+        Call this before accepting an upload so a full server can answer 429
+        without reading the body. Pair with submit() or release().
+        """
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull(f"{self.max_workers} jobs running and {self.max_queued} queued")
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.work_dir, job_id)
+        os.makedirs(job_dir)
+        return job_id, os.path.join(job_dir, "input.mp4"), os.path.join(job_dir, "output.avi")
+
+    def release(self, job_id):
+        """Give back a reserved slot whose upload failed"""
+        shutil.rmtree(os.path.join(self.work_dir, job_id), ignore_errors=True)
+        self._slots.release()
+
+    def submit(self, job_id, input_path, output_path, options=None, keep_input=False):
+        """Queue a reserved job; returns (status dict, future)
+
+        input_path may also be a stream URL; keep_input=True leaves a local
+        input in place afterwards (a live source the job does not own).
+        """
+        self.purge_expired()
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "progress": 0.0,
+            "frames_done": 0,
+            "total_frames": 0,
+            "created_at": time.time(),
+            "finished_at": None,
+            "input_path": input_path,
+            "keep_input": keep_input,
+            "output_path": output_path,
+            "options": dict(self.default_options, **(options or {})),
+            "profile": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+
+        future = self._executor.submit(self._run, job)
+        return self.status(job_id), future
+
+    def _run(self, job):
+        job["status"] = "running"
+
+        def on_progress(frames_done, total_frames, profile=None):
+            job["frames_done"] = frames_done
+            job["total_frames"] = total_frames
+            if profile is not None:
+                job["profile"] = profile
+            if total_frames > 0:
+                job["progress"] = round(min(frames_done / total_frames, 1.0), 4)
+
+        try:
+            result = self.process_fn(job["input_path"], job["output_path"],
+                                     progress_callback=on_progress, model=self._worker_model(),
+                                     **job["options"])
+            if result.get("error"):
+                job["status"] = "error"
+                job["error"] = result["error"]
+            else:
+                job["status"] = "done"
+                job["progress"] = 1.0
+                job["result"] = result
+        except Exception:
+            job["status"] = "error"
+            job["error"] = traceback.format_exc()
+        finally:
+            job["finished_at"] = time.time()
+            # The upload is no longer needed once processing has finished
+            if not job["keep_input"] and os.path.exists(job["input_path"]):
+                os.remove(job["input_path"])
+            self._slots.release()
+        return self.status(job["job_id"])
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def status(self, job_id):
+        """Public view of a job (no filesystem paths)"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        hidden = ("input_path", "keep_input", "output_path", "options")
+        return {key: value for key, value in job.items() if key not in hidden}
+
+    def result_path(self, job_id):
+        """Path of a finished job's output file (video, or Parquet analytics), or None"""
+        job = self.get(job_id)
+        if job is None or job["status"] != "done" or not job["result"]:
+            return None
+        # process_fn may have changed the extension (e.g. .mp4 -> .avi)
+        name = job["result"].get("processed_video_url") or job["result"].get("analytics_url") or ""
+        path = os.path.join(os.path.dirname(job["output_path"]), name)
+        return path if os.path.isfile(path) else None
+
+    def capacity(self):
+        """Pool size and current load, for health reporting"""
+        with self._lock:
+            running = sum(1 for job in self.jobs.values() if job["status"] == "running")
+            queued = sum(1 for job in self.jobs.values() if job["status"] == "queued")
+        return {"max_workers": self.max_workers, "max_queued": self.max_queued,
+                "running": running, "queued": queued}
+
+    def purge_expired(self):
+        """Forget finished jobs older than result_ttl_seconds and delete their directories"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job["finished_at"] is not None and now - job["finished_at"] > self.result_ttl_seconds
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+        for job_id in expired:
+            shutil.rmtree(os.path.join(self.work_dir, job_id), ignore_errors=True)
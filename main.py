@@ -1,7 +1,9 @@
 import os
 import cv2
 import gc
+import time
 import numpy as np
+from collections import deque
 
 # Disable YOLO internet calls (IMPORTANT for Render)
 os.environ["YOLO_OFFLINE"] = "1"
@@ -15,13 +17,99 @@ from player_ball_assigner import *
 from camera_movement import *
 from view_transformation import *
 from speed_and_distance import *
-from ultralytics import YOLO
+from analytics import MatchAnalytics, parquet_available, PARQUET_MISSING
+from detection_cache import DetectionCache
+from pipeline import (FrameReader, FramePool, FrameWriter, LiveFrameReader, MemoryMonitor, Profiler,
+                      StageStats, bottleneck_stage, process_video_segmented, profile_registry)
 
 os.environ["LOKY_MAX_CPU_COUNT"] = "4"
 
+MODEL_PATH = "models/yolov8n.pt"  # LOCAL MODEL
+# Live streams never end: keep the analytics series to a recent window
+LIVE_ANALYTICS_MAX_INTERVALS = 600
 
-def process_video_optimized(input_path, output_path):
 
+def load_model(slot=0):
+    """Shared, warmed-up lightweight YOLO model (yolov8n.pt), loaded once per process"""
+    return model_registry.get(MODEL_PATH, slot)
+
+
+def follow_camera(cap, num_frames, frame_size=(640, 360)):
+    """CameraMovement fed the next num_frames frames of cap, left on the frame after them
+
+    Only decode, resize and optical flow: a segment uses it to start from
+    the same camera state a serial run reaches at its first frame.
+    """
+    camera_movement = None
+    source = frame = None
+    for _ in range(num_frames):
+        ret, source = cap.read(source)
+        if not ret:
+            break
+        frame = cv2.resize(source, frame_size, dst=frame)
+        if camera_movement is None:
+            camera_movement = CameraMovement(frame)
+        camera_movement.update(frame)
+    return camera_movement
+
+
+def process_video_parallel(input_path, output_path, max_workers=None, overlap_seconds=2.0, **options):
+    """Long matches: overlapping time segments on a process pool, stitched back together
+
+    See pipeline.segments.process_video_segmented; each worker process
+    loads its own model. Short clips fall back to a serial run.
+    """
+    return process_video_segmented(process_video_optimized, input_path, output_path,
+                                   max_workers=max_workers, overlap_seconds=overlap_seconds,
+                                   **options)
+
+
+def process_video_optimized(input_path, output_path, batch_size=8, prefetch_frames=32,
+                            pipelined=True, possession_window_seconds=None,
+                            ball_lookahead_frames=5, progress_callback=None, model=None,
+                            cache_dir=None, cache_max_bytes=2 * 1024 ** 3,
+                            detect_every=1, adaptive_detection=False, ball_roi=False,
+                            memory_budget_mb=None, gc_every_frames=1000,
+                            start_frame=0, end_frame=None, overlap_frames=0,
+                            trace_allocations=False, analytics_only=False, analytics_format="json",
+                            analytics_interval_seconds=1.0, analytics_max_intervals=None,
+                            live=False, loop=False,
+                            max_latency_seconds=1.0, live_stats=None, live_stats_every_seconds=1.0,
+                            stop_event=None):
+    """Track, annotate and encode a clip (or the frames [start_frame, end_frame) of it)
+
+    With a frame range the run is one segment of a parallel job (see
+    pipeline.segments): it first follows the camera over every frame before
+    the range (optical flow only, so pitch coordinates match a serial run),
+    replays up to overlap_frames frames before start_frame to warm up
+    tracking, team and speed state without writing or counting them, and
+    reports the boundary boxes and per-track distances needed to stitch
+    segments together.
+
+    progress_callback(frames_done, total_frames, profile=...) is called
+    once per batch with the running per-stage timing summary.
+
+    analytics_only skips every overlay and the video encoder and returns
+    result["analytics"] instead: per-player totals plus a time series
+    down-sampled to analytics_interval_seconds. With analytics_format
+    "parquet" the series is also written next to output_path
+    (result["analytics_url"]; needs pandas and pyarrow). With
+    analytics_max_intervals only that many of the latest intervals of the
+    series are kept (live runs default to LIVE_ANALYTICS_MAX_INTERVALS).
+
+    live=True treats input_path as a live source: anything OpenCV/FFmpeg
+    opens (RTSP/HTTP URL, named pipe) or a file paced at its frame rate
+    and rewound with loop=True. Frames are processed one at a time and
+    dropped to stay within max_latency_seconds; every
+    live_stats_every_seconds a stats event goes to live_stats.publish().
+    Runs until the source ends or stop_event is set; no detection cache,
+    segments or ball ROI pass.
+    """
+
+    reader = None
+    profiler = Profiler(trace_allocations=trace_allocations)
+    writer = None
+    cache_writer = None
     try:
         print("Reading video...")
         cap = cv2.VideoCapture(input_path)
@@ -31,91 +119,392 @@ def process_video_optimized(input_path, output_path):
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        segment_mode = start_frame > 0 or end_frame is not None
+        if live:
+            if segment_mode:
+                raise ValueError("A live source cannot be processed as a segment")
+            total_frames = 0  # unknown, or endless when looped
+            if analytics_max_intervals is None:
+                analytics_max_intervals = LIVE_ANALYTICS_MAX_INTERVALS
+            cache_dir = None
+            ball_roi = False
+        warmup_frames = min(overlap_frames, start_frame)
+        decode_start = start_frame - warmup_frames
+        camera_movement = None
+        if decode_start > 0:
+            # Pitch coordinates depend on the camera offset since frame 0, so
+            # a segment follows the camera over every earlier frame first
+            t0 = time.perf_counter()
+            camera_movement = follow_camera(cap, decode_start)
+            profiler.record("camera_prefix", time.perf_counter() - t0, decode_start)
+        if end_frame is not None:
+            total_frames = min(end_frame, total_frames) if total_frames > 0 else end_frame
+        total_frames -= start_frame
+        if segment_mode:
+            cache_dir = None  # cache entries cover whole clips
+        segment_head = []
+        segment_tail = deque(maxlen=max(overlap_frames, 1))
+        distance_start = {}
 
         # Convert MP4 to AVI (Render Safe)
         output_path = output_path.replace(".mp4", ".avi")
-        fourcc = cv2.VideoWriter_fourcc(*"XVID")
-        out = cv2.VideoWriter(output_path, fourcc, fps, (640, 360))  # output resized
+        out = None
+        analytics = None
+        if analytics_only:
+            # 🟢 ANALYTICS ONLY — numbers without pixels: no overlays, no encoder
+            if analytics_format not in ("json", "parquet"):
+                raise ValueError(f"Unknown analytics format: {analytics_format}")
+            if analytics_format == "parquet" and not parquet_available():
+                raise ImportError(PARQUET_MISSING)  # before the clip is processed, not after
+            analytics = MatchAnalytics(fps, interval_seconds=analytics_interval_seconds,
+                                       max_intervals=analytics_max_intervals)
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*"XVID")
+            out = cv2.VideoWriter(output_path, fourcc, fps, (640, 360))  # output resized
+
+        # Content-addressed cache: a clip seen before (same bytes, same
+        # detection settings) replays its tracks and camera shifts instead
+        # of running YOLO, ByteTrack and optical flow again
+        cached = None
+        cache_status = "off"
+        if cache_dir:
+            detection_cache = DetectionCache(cache_dir, max_bytes=cache_max_bytes)
+            cache_key = detection_cache.key_for(input_path, {
+                "model": MODEL_PATH, "frame_size": [640, 360], "conf": 0.1, "camera_downscale": 0.5,
+                "detect_every": detect_every, "adaptive_detection": adaptive_detection,
+                "ball_roi": ball_roi
+            })
+            cached = detection_cache.open(cache_key)
+            if cached is not None:
+                cache_status = "hit"
+            else:
+                cache_status = "miss"
+                cache_writer = detection_cache.writer(cache_key)
 
-        print("Loading lightweight YOLO model (yolov8n.pt)...")
-        model = YOLO("models/yolov8n.pt")  # LOCAL MODEL
-        tracker = Tracker(model)
+        # Pool workers pass their own slot's model; others share slot 0
+        tracker = None
+        if cached is None:
+            if model is None:
+                model = load_model()
+            # 🟢 FRAME SKIPPING — YOLO every detect_every frames (or earlier on
+            # fast pans / drifting boxes in adaptive mode); boxes in between
+            # come from a constant-velocity model
+            # 🟢 BALL ROI — frames where the 640x360 pass misses the ball get a
+            # small full-resolution crop around its predicted position
+            ball_detector = BallDetector(model, frame_size=(640, 360)) if ball_roi else None
+            tracker = Tracker(model, batch_size=batch_size, detect_every=detect_every,
+                              adaptive=adaptive_detection, ball_detector=ball_detector)
+            tracker.profiler = profiler
 
         team_assigner = TeamAssigner()
-        player_assigner = PlayerBallAssigner()
-        speed_est = SpeedAndDistance_Estimator()
-        camera_movement = None
+        player_assigner = PlayerBallAssigner(switch_margin=10, min_switch_frames=3)
+        speed_est = SpeedAndDistance_Estimator(frame_rate=fps if fps > 0 else 24)
+        camera_total = camera_movement.total_movement.copy() if camera_movement is not None else np.zeros(2)
+        track_store = TrackStore()
+        view_transformer = ViewTransformer(frame_size=(640, 360))
 
-        team_colors_assigned = False
-        team_ball_possession = []
+        possession_window = int(possession_window_seconds * fps) if possession_window_seconds else None
+        team_ball_possession = TeamBallPossession(window_frames=possession_window)
+
+        # Ball gaps up to ball_lookahead_frames long are filled before a frame
+        # reaches possession and drawing, at the cost of that much latency
+        # (with frame skipping the ball is only detected on detector frames,
+        # so the look-ahead must span at least one skip interval)
+        lookahead = max(ball_lookahead_frames, detect_every - 1)
+        if live:
+            # Held-back frames count against the latency budget: spend at most half of it
+            lookahead = min(lookahead, int(max_latency_seconds * (fps if fps > 0 else 24) / 2))
+        ball_interpolator = StreamingBallInterpolator(lookahead=lookahead)
+
+        capture_times = deque()
+        live_state = {"latency_s": None, "players": {}, "published_at": time.perf_counter()}
 
         frame_id = 0
+        warmup_pending = warmup_frames > 0
+
+        def finish_frame(ball_bbox, interpolated, payload):
+            """Possession, drawing and encoding once the ball is known; returns seconds blocked"""
+            nonlocal warmup_pending
+            frame, frame_tracks, player_ids, player_bboxes, cam_shift, owned = payload
+            players_dict = frame_tracks["players"][0]
+            if interpolated:
+                frame_tracks["ball"][0][1] = {"bbox": ball_bbox.tolist(), "interpolated": True}
+            if owned and warmup_pending:
+                # Segment warm-up is over: keep the last team, drop its counts
+                team_ball_possession.reset()
+                warmup_pending = False
+
+            t0 = time.perf_counter()
+            # Vectorised owner lookup on the columns, with hysteresis so
+            # possession does not flicker between two nearby players
+            nearest = player_assigner.update_owner(player_ids, player_bboxes, ball_bbox)
+            owner_team = 0
+            if nearest != -1:
+                players_dict[nearest]["ball_possession"] = True
+                owner_team = players_dict[nearest]["team"]
+            if owner_team:
+                team_ball_possession.update(owner_team)
+            elif team_ball_possession.last_team is not None:
+                # Nobody, or a player without a team yet, has the ball
+                team_ball_possession.update_previous()
+            # Until a team is known (team model warm-up) no frame is counted
+
+            t1 = time.perf_counter()
+            profiler.record("possession", t1 - t0)
+            if owned and analytics is not None:
+                analytics.add_possession(team_ball_possession.last_team)
+            if live:
+                latency = time.perf_counter() - capture_times.popleft()
+                profiler.record("live_latency", latency)
+                live_state["latency_s"] = latency
+                live_state["players"] = players_dict
+            if not owned or writer is None:
+                frame_pool.release(frame)
+                return 0.0
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+            # Single compositor: every overlay is drawn straight onto the
+            # pooled frame, and the writer hands the buffer back once encoded
+            Tracker.draw_annotations([frame], frame_tracks, team_ball_possession, in_place=True)
+            camera_movement.draw_camera_movement([frame], cam_shift, in_place=True)
+            speed_est.draw_speed_and_distance([frame], frame_tracks, in_place=True)
+            profiler.record("draw", time.perf_counter() - t1)
 
-            # 🟢 LOW MEMORY — RESIZE FRAME
-            frame = cv2.resize(frame, (640, 360))
+            return writer.write(frame)
 
+        # 🟢 LOW MEMORY — decode + resize ahead into a bounded queue,
+        # so memory is capped by prefetch_frames + batch_size, not clip length.
+        # In pipelined mode decode and encode run on their own threads and
+        # the bounded queues give backpressure in both directions.
+        # 🟢 BUFFER REUSE — decode into one reused source buffer and resize
+        # into pooled 640x360 buffers that cycle reader -> overlays -> encoder
+        # -> pool, so steady state allocates no frames at all.
+        # Full-resolution frames are only kept while the ball detector needs them
+        keep_source = tracker is not None and tracker.ball_detector is not None
+        frame_pool = FramePool((360, 640, 3))
+        if live:
+            # 🟢 LIVE — newest frame only: under load frames are dropped, not queued
+            reader = LiveFrameReader(cap, frame_size=(640, 360), max_latency_seconds=max_latency_seconds,
+                                     loop=loop, pool=frame_pool, profiler=profiler, stop_event=stop_event)
+        else:
+            reader = FrameReader(cap, frame_size=(640, 360), max_queue=prefetch_frames,
+                                 threaded=pipelined, keep_source=keep_source, pool=frame_pool,
+                                 max_frames=end_frame - decode_start if end_frame is not None else None,
+                                 profiler=profiler)
+        if out is not None:
+            writer = FrameWriter(out, max_queue=prefetch_frames, threaded=pipelined, pool=frame_pool,
+                                 profiler=profiler)
+        infer_stats = StageStats("infer")
+
+        # 🟩 MEMORY BUDGET — no per-frame gc.collect() / waitKey: RSS is
+        # sampled once per batch and a collection runs only when over
+        # memory_budget_mb or every gc_every_frames frames
+        memory = MemoryMonitor(
+            budget_bytes=memory_budget_mb * 1024 ** 2 if memory_budget_mb else None,
+            collect_every=gc_every_frames
+        )
+
+        for frames in reader.batches(batch_size, stats=infer_stats):
+            batch_start = time.perf_counter()
+            source_frames = None
+            if keep_source:
+                source_frames = [source for _, source in frames]
+                frames = [frame for frame, _ in frames]
+            blocked = 0.0
+
+            # One YOLO call per micro-batch; ByteTrack is fed in frame order.
+            # Detections land in reused columnar buffers (frame i of the batch
+            # is store frame i), so per-frame geometry is a few vector ops.
+            track_store.clear()
             if camera_movement is None:
-                camera_movement = CameraMovement(frame)
-
-            frame_tracks = tracker.get_object_tracks([frame], read_from_stub=False)
-            tracker.add_position_to_tracks(frame_tracks)
-
-            cam_shift = camera_movement.get_camera_movement([frame])
-            camera_movement.adjust_tracks_positions(frame_tracks, cam_shift)
-
-            players_dict = frame_tracks.get("players", {})
-            if (not team_colors_assigned) and len(players_dict) > 0:
-                first_player_set = list(players_dict.values())[0]
-                team_assigner.assign_team_color(frame, first_player_set)
-                team_colors_assigned = True
-
-            for pid, pdata in players_dict.items():
-                team = team_assigner.get_player_team(frame, pdata["bbox"], pid)
-                pdata["team"] = team
-                pdata["team_color"] = team_assigner.team_colors.get(team, [255, 255, 255])
-
-            ball_dict = frame_tracks.get("ball", {})
-            ball_bbox = ball_dict.get(1, {}).get("bbox")
-
-            if ball_bbox:
-                nearest = player_assigner.assign_ball_to_player(players_dict, ball_bbox)
-                if nearest != -1:
-                    players_dict[nearest]["ball_possession"] = True
-                    team_ball_possession.append(players_dict[nearest]["team"])
-                else:
-                    team_ball_possession.append(team_ball_possession[-1] if team_ball_possession else 1)
+                camera_movement = CameraMovement(frames[0])
+            t0 = time.perf_counter()
+            if cached is not None:
+                cached_frames = [cached.frame(frame_id + i) for i in range(len(frames))]
+                for track_ids, class_ids, bboxes, _ in cached_frames:
+                    track_store.append_frame(track_ids, class_ids, bboxes)
+                batch_shifts = [camera_movement.record_movement(cached_frame[3])
+                                for cached_frame in cached_frames]
+                profiler.record("cache_read", time.perf_counter() - t0, len(frames))
             else:
-                team_ball_possession.append(team_ball_possession[-1] if team_ball_possession else 1)
+                # Camera shifts first, so adaptive skipping can react to pans
+                batch_shifts = camera_movement.get_camera_movement(frames)
+                profiler.record("camera_flow", time.perf_counter() - t0, len(frames))
+                tracker.get_object_track_store(frames, store=track_store, camera_shifts=batch_shifts,
+                                               source_frames=source_frames)
+
+            for i, frame in enumerate(frames):
+                t0 = time.perf_counter()
+                cam_shift = [batch_shifts[i]]
+                camera_total += cam_shift[0]
+                if cache_writer is not None:
+                    cache_writer.add_frame(
+                        track_store.column("track_id", i),
+                        track_store.column("class_id", i),
+                        track_store.column("bbox", i),
+                        cam_shift[0]
+                    )
+                track_store.adjust_positions(i, cam_shift[0])
+                track_store.transform_positions(i, view_transformer, camera_total)
 
-            speed_est.add_speed_and_distance(frame_tracks)
+                if segment_mode and frame_id == warmup_frames:
+                    distance_start = speed_est.total_distances()
+                speeds, distances = speed_est.update_frame(
+                    track_store.column("track_id", i, "players"),
+                    track_store.column("position_transformed", i, "players"),
+                    frame_num=reader.last_indices[i] if live else None
+                )
+                track_store.set_column("speed", i, speeds, "players")
+                track_store.set_column("distance", i, distances, "players")
+                t1 = time.perf_counter()
+                profiler.record("geometry", t1 - t0)
 
-            annotated = tracker.draw_annotations([frame], frame_tracks, np.array(team_ball_possession))[0]
-            annotated = camera_movement.draw_camera_movement(annotated, cam_shift)
-            annotated = speed_est.draw_speed_and_distance(annotated, frame_tracks)
+                # Old dict shape for the dict-based stages and drawing
+                frame_tracks = track_store.frame_tracks(i)
+                players_dict = frame_tracks["players"][0]
+                # Online team model: warms up, refits on schedule and only
+                # extracts colors for new or low-confidence tracks
+                player_teams = team_assigner.update(frame, players_dict)
+                for pid, pdata in players_dict.items():
+                    team, confidence = player_teams[pid]
+                    pdata["team"] = team
+                    pdata["team_confidence"] = confidence
+                    pdata["team_color"] = team_assigner.team_colors.get(team, [255, 255, 255])
+                teams = [player_teams[pid][0] for pid in players_dict]
+                track_store.set_column("team", i, teams, "players")
+                profiler.record("team_colors", time.perf_counter() - t1)
 
-            out.write(annotated)
-            frame_id += 1
+                if analytics is not None and frame_id >= warmup_frames:
+                    analytics.add_frame(track_store.column("track_id", i, "players"), teams,
+                                        speeds, distances)
 
-            # 🟩 CRITICAL MEMORY CLEANUP
-            cv2.waitKey(1)
-            del frame_tracks
-            gc.collect()
+                if segment_mode:
+                    # Player boxes either side of the boundary, for ID stitching
+                    boxes = {int(pid): list(map(float, pdata["bbox"])) for pid, pdata in players_dict.items()}
+                    (segment_head if frame_id < warmup_frames else segment_tail).append(boxes)
+
+                # Column copies, so the payload outlives the store's next clear()
+                ball_bboxes = track_store.column("bbox", i, "ball")
+                payload = (
+                    frame, frame_tracks,
+                    track_store.column("track_id", i, "players"),
+                    track_store.column("bbox", i, "players"),
+                    cam_shift,
+                    frame_id >= warmup_frames
+                )
+                if live:
+                    capture_times.append(reader.last_captured[i])
+                ready = ball_interpolator.push(ball_bboxes[0] if len(ball_bboxes) > 0 else None, payload)
+                for ball_bbox, interpolated, ready_payload in ready:
+                    blocked += finish_frame(ball_bbox, interpolated, ready_payload)
+                frame_id += 1
+
+            infer_stats.add_blocked(blocked)
+            infer_stats.add_busy(time.perf_counter() - batch_start - blocked, items=len(frames))
+
+            # Live batches are single frames: report on the stats interval instead
+            now = time.perf_counter()
+            live_due = live and now - live_state["published_at"] >= live_stats_every_seconds
+            if progress_callback is not None and (not live or live_due):
+                progress_callback(frame_id, total_frames, profile=profiler.summary(frame_id))
+
+            if live_due:
+                live_state["published_at"] = now
+            if live_due and live_stats is not None:
+                live_stats.publish({
+                    "type": "stats",
+                    "frames": frame_id,
+                    "source_frame": reader.last_indices[-1],
+                    "frames_dropped": reader.frames_dropped,
+                    "latency_s": round(live_state["latency_s"], 3) if live_state["latency_s"] is not None else None,
+                    "possession": team_ball_possession.as_dict(),
+                    "players": {
+                        str(pid): {"team": int(pdata["team"]) if pdata.get("team") else None,
+                                   "speed_kmh": round(pdata["speed"], 1) if "speed" in pdata else None,
+                                   "distance_m": round(pdata["distance"], 1) if "distance" in pdata else None}
+                        for pid, pdata in live_state["players"].items()
+                    },
+                })
+
+            memory.check(frame_id, {
+                "track_store_bytes": track_store.nbytes(),
+                "possession_window_frames": len(team_ball_possession.window or ()),
+                "speed_tracks": len(speed_est.track_state),
+                "speed_retired_tracks": len(speed_est.retired_distance),
+                "team_tracks": len(team_assigner.player_state),
+                "ball_pending_frames": len(ball_interpolator.pending),
+                "frame_pool": frame_pool.as_dict(),
+            })
+
+        for ball_bbox, interpolated, ready_payload in ball_interpolator.flush():
+            finish_frame(ball_bbox, interpolated, ready_payload)
 
         cap.release()
-        out.release()
+        if writer is not None:
+            writer.close()
+            out.release()
+
+        if cache_writer is not None:
+            cache_writer.commit()
+            cache_writer = None
 
-        return {
-            "processed_video_url": os.path.basename(output_path)
+        stages = [reader.stats, infer_stats] + ([writer.stats] if writer is not None else [])
+        pipeline_stats = {stage.name: stage.as_dict() for stage in stages}
+        pipeline_stats["bottleneck"] = bottleneck_stage(stages)
+        pipeline_stats["frame_pool"] = frame_pool.as_dict()
+        print(f"Pipeline stats: {pipeline_stats}")
+
+        result = {
+            "processed_video_url": os.path.basename(output_path) if writer is not None else None,
+            "possession": team_ball_possession.as_dict(),
+            "detection_cache": cache_status,
+            "detection": tracker.detection_stats() if tracker is not None else None,
+            "pipeline_stats": pipeline_stats,
+            "memory": memory.as_dict(),
+            "profile": profiler.summary(frame_id)
         }
+        profile_registry.add_run(profiler, frame_id)
+        if live:
+            result["live"] = reader.as_dict()
+        if analytics is not None:
+            analytics.finish()
+            if analytics_format == "parquet":
+                analytics_path = os.path.splitext(output_path)[0] + "_analytics.parquet"
+                analytics.to_parquet(analytics_path)
+                result["analytics_url"] = os.path.basename(analytics_path)
+                result["analytics"] = {key: value for key, value in analytics.as_dict().items()
+                                       if key not in ("player_series", "possession_series")}
+            else:
+                result["analytics"] = analytics.as_dict()
+        if segment_mode:
+            distance_end = speed_est.total_distances()
+            result["segment"] = {
+                "start_frame": start_frame,
+                "end_frame": decode_start + frame_id,
+                "warmup_frames": warmup_frames,
+                "head": segment_head,
+                "tail": list(segment_tail) if overlap_frames else [],
+                "team_colors": {str(team): [float(c) for c in color]
+                                for team, color in team_assigner.team_colors.items()},
+                "player_distances": {
+                    str(track_id): distance - distance_start.get(track_id, 0.0)
+                    for track_id, distance in distance_end.items()
+                    if distance > distance_start.get(track_id, 0.0)
+                },
+            }
+        return result
 
     except Exception as e:
         print(f"Processing error: {e}")
         return {"error": str(e)}
 
     finally:
+        if reader is not None:
+            reader.stop()
+        if writer is not None:
+            writer.stop()
+        if cache_writer is not None:
+            cache_writer.abort()
+        profiler.stop()
         gc.collect()
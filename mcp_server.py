@@ -1,8 +1,14 @@
 import os
 import base64
+import threading
 import traceback
-from flask import Flask, request, jsonify
-from main import process_video_optimized
+from flask import Flask, Response, request, jsonify, send_file, url_for
+from main import (process_video_optimized, process_video_parallel, load_model, MODEL_PATH,
+                  LIVE_ANALYTICS_MAX_INTERVALS)
+from trackers import model_registry
+from jobs import JobManager, JobQueueFull, save_stream
+from pipeline import StatsBroadcaster, profile_registry, current_rss_bytes
+from analytics import parquet_available, PARQUET_MISSING
 
 # ============================================================
 # 🔥 Disable ALL Ultralytics internet, GitHub, and version checks
@@ -26,11 +32,100 @@ ultralytics.checks.check_latest_pip_version = lambda *a, **k: None
 app = Flask(__name__)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
-OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+# One sub-directory per job, so concurrent requests never share files
+WORK_DIR = os.path.join(BASE_DIR, "job_data")
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 2 * 1024 ** 3))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Concurrent jobs. Each worker slot keeps its own warmed-up YOLO copy
+# (roughly 100-200 MB resident for yolov8n with torch on CPU), all loaded
+# at import unless MODEL_PRELOAD=0, so raise it only as memory allows
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", 2))
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", MAX_WORKERS))
+
+# Re-uploads of the same clip skip inference (content-addressed, LRU by size)
+DETECTION_CACHE_DIR = os.environ.get("DETECTION_CACHE_DIR", os.path.join(BASE_DIR, "cache_data"))
+DETECTION_CACHE_MAX_BYTES = int(os.environ.get("DETECTION_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+# Run YOLO every DETECT_EVERY frames; ADAPTIVE_DETECTION=1 re-detects early
+# on fast pans or drifting boxes (DETECT_EVERY is then the longest gap)
+DETECT_EVERY = int(os.environ.get("DETECT_EVERY", 1))
+ADAPTIVE_DETECTION = os.environ.get("ADAPTIVE_DETECTION", "0") == "1"
+# BALL_ROI=1: second, full-resolution ball pass on frames where it was missed
+BALL_ROI = os.environ.get("BALL_ROI", "0") == "1"
+
+# Garbage collection runs when RSS exceeds MEMORY_BUDGET_MB (whole process)
+# or every GC_EVERY_FRAMES frames, never per frame
+MEMORY_BUDGET_MB = int(os.environ["MEMORY_BUDGET_MB"]) if os.environ.get("MEMORY_BUDGET_MB") else None
+GC_EVERY_FRAMES = int(os.environ.get("GC_EVERY_FRAMES", 1000))
+
+# SEGMENT_WORKERS>1: each job splits long clips into overlapping segments
+# processed by that many worker processes (size MAX_WORKERS accordingly)
+SEGMENT_WORKERS = int(os.environ.get("SEGMENT_WORKERS", 0))
+segment_options = {"max_workers": SEGMENT_WORKERS} if SEGMENT_WORKERS > 1 else {}
+
+# Live sources a client may ask the server to open (comma-separated
+# prefixes). Only RTSP by default: FFmpeg opening arbitrary http(s) URLs
+# lets callers reach internal endpoints, and its HLS/concat demuxers can
+# be steered into local files, so opt in to http://, a specific host or a
+# local directory (looped files, named pipes) deliberately. Each live
+# stream holds a worker slot until stopped.
+LIVE_SOURCE_PREFIXES = tuple(
+    prefix.strip() for prefix in
+    os.environ.get("LIVE_SOURCE_PREFIXES", "rtsp://,rtsps://").split(",")
+    if prefix.strip()
+)
+LIVE_MAX_LATENCY_SECONDS = float(os.environ.get("LIVE_MAX_LATENCY_SECONDS", 1.0))
+# Analytics intervals a live stream keeps for its final result (totals cover the whole run)
+LIVE_ANALYTICS_MAX_INTERVALS = int(os.environ.get("LIVE_ANALYTICS_MAX_INTERVALS", LIVE_ANALYTICS_MAX_INTERVALS))
+
+job_manager = JobManager(process_video_parallel if SEGMENT_WORKERS > 1 else process_video_optimized,
+                         WORK_DIR, max_workers=MAX_WORKERS,
+                         max_queued=MAX_QUEUED_JOBS, model_factory=load_model,
+                         default_options={**segment_options,
+                                          "cache_dir": DETECTION_CACHE_DIR,
+                                          "cache_max_bytes": DETECTION_CACHE_MAX_BYTES,
+                                          "detect_every": DETECT_EVERY,
+                                          "adaptive_detection": ADAPTIVE_DETECTION,
+                                          "ball_roi": BALL_ROI,
+                                          "memory_budget_mb": MEMORY_BUDGET_MB,
+                                          "gc_every_frames": GC_EVERY_FRAMES})
+
+# Load + warm one model per worker slot at import (MODEL_PRELOAD=0: on first job)
+MODEL_PRELOAD = os.environ.get("MODEL_PRELOAD", "1") == "1"
+if MODEL_PRELOAD:
+    try:
+        model_registry.preload(MODEL_PATH, slots=range(MAX_WORKERS))
+    except Exception as e:
+        print(f"Model preload failed: {e}")
+else:
+    model_registry.expect(MODEL_PATH, slots=range(MAX_WORKERS))
+
+
+# job_id -> {"events": StatsBroadcaster, "stop": threading.Event} of live streams;
+# request threads add, purge and look up entries concurrently
+live_streams = {}
+live_streams_lock = threading.Lock()
+
+
+def too_busy(e):
+    return jsonify({"error": "server busy, retry later", "details": str(e)}), 429, {"Retry-After": "30"}
+
+
+def analytics_options(params):
+    """Per-request analytics-only options from query args or a JSON body; raises ValueError"""
+    flag = params.get("analytics_only", False)
+    if isinstance(flag, str):
+        flag = flag.lower() in ("1", "true", "yes")
+    if not flag:
+        return {}
+    analytics_format = params.get("format", "json")
+    if analytics_format not in ("json", "parquet"):
+        raise ValueError("format must be 'json' or 'parquet'")
+    if analytics_format == "parquet" and not parquet_available():
+        raise ValueError(PARQUET_MISSING)
+    return {"analytics_only": True, "analytics_format": analytics_format}
 
 # ============================================================
 # Health Check Route
@@ -38,7 +133,206 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 @app.route("/", methods=["GET"])
 def home():
-    return {"status": "MCP API Running", "message": "Use POST /run-tracking"}, 200
+    return {"status": "MCP API Running", "message": "Use POST /jobs (or legacy POST /run-tracking)"}, 200
+
+@app.route("/health", methods=["GET"])
+def health():
+    """Readiness: models loaded and warmed, plus worker pool load
+
+    503 until every worker slot's model is warm. With MODEL_PRELOAD=0
+    models load on the first job, so "lazy_load" is set and the replica
+    answers 200 (ready stays false) as long as no load has failed.
+    """
+    status = model_registry.status()
+    status["workers"] = job_manager.capacity()
+    status["lazy_load"] = not MODEL_PRELOAD
+    failed = any(info["state"] == "error" for info in status["models"])
+    accepting = status["ready"] or (status["lazy_load"] and not failed)
+    return jsonify(status), 200 if accepting else 503
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text format: per-stage latency histograms plus pool and memory gauges"""
+    capacity = job_manager.capacity()
+    gauges = {
+        "jobs_running": capacity["running"],
+        "jobs_queued": capacity["queued"],
+        "workers": capacity["max_workers"],
+        "process_rss_bytes": current_rss_bytes() or 0,
+    }
+    return Response(profile_registry.render(gauges), mimetype="text/plain; version=0.0.4")
+
+# ============================================================
+# ASYNC JOB API
+# ============================================================
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    """Upload a video (raw body or multipart field "video") and queue it
+
+    ?analytics_only=1 skips rendering and encoding; the job result then
+    holds the statistics, and ?format=parquet also makes /result a
+    Parquet download.
+    """
+    try:
+        options = analytics_options(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        job_id, input_path, output_path = job_manager.reserve()
+    except JobQueueFull as e:
+        return too_busy(e)
+
+    # Every way out before submit() hands the slot and directory back
+    submitted = False
+    try:
+        # -------------------------------------------------------
+        # 1️⃣ Stream the upload to disk in chunks (never fully in memory)
+        # -------------------------------------------------------
+        try:
+            if request.mimetype == "multipart/form-data":
+                upload = request.files.get("video")
+                if upload is None:
+                    return jsonify({"error": "multipart field 'video' missing"}), 400
+                size = save_stream(upload.stream, input_path, UPLOAD_CHUNK_BYTES, MAX_UPLOAD_BYTES)
+            else:
+                size = save_stream(request.stream, input_path, UPLOAD_CHUNK_BYTES, MAX_UPLOAD_BYTES)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 413
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": "Upload failed",
+                "details": str(e)
+            }), 500
+
+        if size == 0:
+            return jsonify({"error": "empty upload"}), 400
+
+        # -------------------------------------------------------
+        # 2️⃣ Hand off to a background worker and return right away
+        # -------------------------------------------------------
+        job, _ = job_manager.submit(job_id, input_path, output_path, options)
+        submitted = True
+    finally:
+        if not submitted:
+            job_manager.release(job_id)
+
+    job["status_url"] = url_for("get_job", job_id=job_id)
+    job["result_url"] = url_for("get_job_result", job_id=job_id)
+    return jsonify(job), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.status(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job)
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    """Download the annotated video (or analytics); supports HTTP Range requests"""
+    job = job_manager.status(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+
+    result = job["result"] or {}
+    if job["status"] == "done" and "analytics" in result and "analytics_url" not in result:
+        return jsonify(result["analytics"])
+
+    path = job_manager.result_path(job_id)
+    if path is None:
+        return jsonify({"error": "result not ready", "status": job["status"]}), 409
+
+    mimetype = "application/vnd.apache.parquet" if path.endswith(".parquet") else "video/x-msvideo"
+    return send_file(path, mimetype=mimetype, as_attachment=True,
+                     download_name=os.path.basename(path), conditional=True)
+
+# ============================================================
+# LIVE STREAMS
+# ============================================================
+
+@app.route("/streams", methods=["POST"])
+def create_stream():
+    """Start analysing a live source; stats arrive on /streams/<id>/events
+
+    JSON body: source (URL, or a path under an allowed prefix), loop,
+    max_latency_seconds, stats_every_seconds and record (also write the
+    annotated video, downloadable from /jobs/<id>/result once stopped).
+    """
+    data = request.get_json(silent=True) or {}
+    source = data.get("source")
+    if not source:
+        return jsonify({"error": "source missing"}), 400
+    if not source.startswith(LIVE_SOURCE_PREFIXES):
+        return jsonify({"error": "source not allowed", "allowed_prefixes": list(LIVE_SOURCE_PREFIXES)}), 400
+    try:
+        max_latency = float(data.get("max_latency_seconds", LIVE_MAX_LATENCY_SECONDS))
+        stats_every = float(data.get("stats_every_seconds", 1.0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "max_latency_seconds and stats_every_seconds must be numbers"}), 400
+
+    try:
+        job_id, _, output_path = job_manager.reserve()
+    except JobQueueFull as e:
+        return too_busy(e)
+
+    events, stop_event = StatsBroadcaster(), threading.Event()
+    with live_streams_lock:
+        for stale_id in [stream_id for stream_id in live_streams if job_manager.status(stream_id) is None]:
+            del live_streams[stale_id]
+        live_streams[job_id] = {"events": events, "stop": stop_event}
+
+    job, future = job_manager.submit(job_id, source, output_path, options={
+        "live": True,
+        "loop": bool(data.get("loop", False)),
+        "max_latency_seconds": max_latency,
+        "live_stats": events,
+        "live_stats_every_seconds": stats_every,
+        "stop_event": stop_event,
+        "analytics_only": not data.get("record", False),
+        "analytics_max_intervals": LIVE_ANALYTICS_MAX_INTERVALS,
+    }, keep_input=True)
+
+    def on_done(future):
+        job = future.result()
+        result = job.get("result") or {}
+        events.close({"type": "end", "status": job["status"], "error": job["error"],
+                      "possession": result.get("possession"), "live": result.get("live")})
+    future.add_done_callback(on_done)
+
+    job["events_url"] = url_for("stream_events", job_id=job_id)
+    job["status_url"] = url_for("get_job", job_id=job_id)
+    return jsonify(job), 202
+
+
+@app.route("/streams/<job_id>/events", methods=["GET"])
+def stream_events(job_id):
+    """Server-Sent Events: a "stats" event every few seconds, then "end"
+
+    Each subscriber holds a connection open, so serve with a threaded or
+    async worker class (e.g. gunicorn --threads or gevent).
+    """
+    with live_streams_lock:
+        stream = live_streams.get(job_id)
+    if stream is None:
+        return jsonify({"error": "stream not found"}), 404
+    return Response(stream["events"].sse(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/streams/<job_id>", methods=["DELETE"])
+def stop_stream(job_id):
+    """Stop a live stream; the job then finishes like any other"""
+    with live_streams_lock:
+        stream = live_streams.get(job_id)
+    if stream is None:
+        return jsonify({"error": "stream not found"}), 404
+    stream["stop"].set()
+    return jsonify(job_manager.status(job_id)), 202
 
 # ============================================================
 # MAIN TRACKING ENDPOINT
@@ -51,9 +345,17 @@ def run_tracking():
 
         if not data or "video_base64" not in data:
             return jsonify({"error": "video_base64 missing"}), 400
+        try:
+            # Only JSON makes sense inline, so no format choice here
+            options = analytics_options(dict(data, format="json"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        input_path = os.path.join(UPLOAD_DIR, "input_api.mp4")
-        output_path = os.path.join(OUTPUT_DIR, "output_api.avi")  # AVI SAFE
+        # Per-request working directory + a slot in the bounded worker pool
+        try:
+            job_id, input_path, output_path = job_manager.reserve()
+        except JobQueueFull as e:
+            return too_busy(e)
 
         # -------------------------------------------------------
         # 1️⃣ Decode Base64 → Save Video File
@@ -62,6 +364,7 @@ def run_tracking():
             with open(input_path, "wb") as f:
                 f.write(base64.b64decode(data["video_base64"]))
         except Exception as e:
+            job_manager.release(job_id)
             return jsonify({
                 "status": "error",
                 "message": "Video decode failed",
@@ -71,14 +374,22 @@ def run_tracking():
         # -------------------------------------------------------
         # 2️⃣ Run Football Tracking Pipeline
         # -------------------------------------------------------
-        try:
-            process_video_optimized(input_path, output_path)
-        except Exception:
+        _, future = job_manager.submit(job_id, input_path, output_path, options)
+        job = future.result()
+        if job["status"] != "done":
             return jsonify({
                 "status": "error",
                 "message": "Processing failed",
-                "details": traceback.format_exc()
+                "details": job["error"]
             }), 500
+        result = job["result"]
+        if options:
+            return jsonify({
+                "status": "success",
+                "possession": result.get("possession"),
+                "analytics": result.get("analytics")
+            })
+        output_path = job_manager.result_path(job_id)
 
         # -------------------------------------------------------
         # 3️⃣ Read Output File and Return as Base64
@@ -95,7 +406,8 @@ def run_tracking():
 
         return jsonify({
             "status": "success",
-            "output_video_base64": out_b64
+            "output_video_base64": out_b64,
+            "possession": result.get("possession")
         })
 
     except Exception:
@@ -0,0 +1,7 @@
+from .frame_reader import FrameReader
+from .live import LiveFrameReader, StatsBroadcaster
+from .frame_pool import FramePool
+from .memory import MemoryMonitor, current_rss_bytes, peak_rss_bytes
+from .profiler import LatencyHistogram, Profiler, ProfileRegistry, profile_registry
+from .stages import StageStats, FrameWriter, bottleneck_stage
+from .segments import process_video_segmented, plan_segments, match_tracks
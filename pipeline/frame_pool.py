@@ -0,0 +1,40 @@
+import threading
+
+import numpy as np
+
+
+class FramePool:
+    """Recycle fixed-shape frame buffers instead of allocating one per frame
+
+    acquire() hands out a free buffer (allocating only when none is free);
+    release() gives it back once nothing reads it any more, which in the
+    pipeline is after the encoder has written it. At most max_free idle
+    buffers are kept.
+    """
+
+    def __init__(self, shape, dtype=np.uint8, max_free=64):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                self.reused += 1
+                return self._free.pop()
+            self.allocated += 1
+        return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, buffer):
+        if buffer is None or buffer.shape != self.shape or buffer.dtype != self.dtype:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(buffer)
+
+    def as_dict(self):
+        return {"allocated": self.allocated, "reused": self.reused, "free": len(self._free)}
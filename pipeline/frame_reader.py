@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+
+import cv2
+
+from .stages import StageStats
+
+
+class FrameReader:
+    """Read frames ahead of the consumer into a bounded queue
+
+    With keep_source=True each item is a (resized, source) pair, for
+    stages that need the full-resolution frame as well. With a FramePool
+    the source is decoded into one reused buffer and resized straight into
+    a pooled buffer, which the consumer must release when done.
+    """
+
+    _END = object()
+
+    def __init__(self, cap, frame_size=(640, 360), max_queue=32, threaded=True, keep_source=False,
+                 pool=None, max_frames=None, profiler=None):
+        self.cap = cap
+        self.profiler = profiler
+        self.max_frames = max_frames
+        self.frames_read = 0
+        self.frame_size = frame_size
+        self.keep_source = keep_source
+        self.pool = pool
+        self._source = None
+        self.threaded = threaded
+        self.stats = StageStats("decode")
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+
+    def start(self):
+        """Start the background decode thread"""
+        if self.threaded and not self._thread.is_alive() and not self._stop_event.is_set():
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop decoding and wait for the thread to exit"""
+        self._stop_event.set()
+        # Unblock a producer waiting on a full queue
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def _read_frame(self):
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            return False, None
+        t0 = time.perf_counter()
+        if self.keep_source or self.frame_size is None:
+            ret, source = self.cap.read()
+        else:
+            # Sources never leave this method, so decode into the same buffer
+            ret, source = self.cap.read(self._source)
+            self._source = source if ret else None
+        t1 = time.perf_counter()
+        frame = source
+        if ret and self.frame_size is not None:
+            dst = self.pool.acquire() if self.pool is not None else None
+            frame = cv2.resize(source, self.frame_size, dst=dst)
+        if ret and self.keep_source:
+            frame = (frame, source)
+        if ret:
+            self.frames_read += 1
+            t2 = time.perf_counter()
+            self.stats.add_busy(t2 - t0)
+            if self.profiler is not None:
+                self.profiler.record("decode", t1 - t0)
+                self.profiler.record("resize", t2 - t1)
+        return ret, frame
+
+    def _put(self, item):
+        t0 = time.perf_counter()
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.stats.add_blocked(time.perf_counter() - t0)
+
+    def _read_loop(self):
+        try:
+            while not self._stop_event.is_set():
+                ret, frame = self._read_frame()
+                if not ret:
+                    break
+                if not self._put(frame):
+                    break
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(self._END)
+
+    def __iter__(self):
+        """Yield decoded frames in order"""
+        if not self.threaded:
+            while not self._stop_event.is_set():
+                ret, frame = self._read_frame()
+                if not ret:
+                    break
+                yield frame
+            return
+
+        self.start()
+        while True:
+            item = self.queue.get()
+            if item is self._END:
+                break
+            yield item
+        if self._error is not None:
+            raise self._error
+
+    def batches(self, batch_size, stats=None):
+        """Yield lists of up to batch_size consecutive frames
+
+        If stats is given, time spent waiting on the decoder is recorded
+        as that (consumer) stage's starved time.
+        """
+        batch = []
+        t0 = time.perf_counter()
+        for frame in self:
+            if stats is not None and self.threaded:
+                stats.sample_queue(self.queue.qsize())
+            batch.append(frame)
+            if len(batch) == batch_size:
+                if stats is not None:
+                    stats.add_starved(time.perf_counter() - t0)
+                yield batch
+                batch = []
+                t0 = time.perf_counter()
+        if batch:
+            if stats is not None:
+                stats.add_starved(time.perf_counter() - t0)
+            yield batch
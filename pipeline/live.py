@@ -0,0 +1,223 @@
+import json
+import queue
+import threading
+import time
+
+import cv2
+
+from .stages import StageStats
+
+
+class LiveFrameReader:
+    """Freshest-frame reader for live sources (RTSP/HTTP/pipe, or a looped file)
+
+    A grabber thread decodes continuously and keeps only the newest frame,
+    so a consumer slower than the source skips frames instead of falling
+    behind; a frame that still got older than max_latency_seconds while
+    waiting (e.g. during a model refit) is dropped as well. Files are paced
+    at their own frame rate, and rewound when loop=True, so they stand in
+    for a camera. Yields single-frame batches; last_indices holds the
+    source frame numbers of the latest batch and last_captured their
+    capture times (perf_counter).
+    """
+
+    def __init__(self, cap, frame_size=(640, 360), max_latency_seconds=1.0, loop=False,
+                 realtime=None, pool=None, profiler=None, stop_event=None):
+        self.cap = cap
+        self.frame_size = frame_size
+        self.max_latency_seconds = max_latency_seconds
+        self.loop = loop
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        # Only files report a frame count; streams arrive at their own pace
+        self.realtime = cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0 if realtime is None else realtime
+        self.pool = pool
+        self.profiler = profiler
+        self.stats = StageStats("decode")
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.last_indices = []
+        self.last_captured = []
+        self._source = None
+        self._latest = None  # (source index, frame, captured_at)
+        self._cond = threading.Condition()
+        self._ended = False
+        self._error = None
+        self._stop_event = stop_event if stop_event is not None else threading.Event()
+        self._thread = threading.Thread(target=self._grab_loop, daemon=True)
+
+    def start(self):
+        if not self._thread.is_alive() and not self._stop_event.is_set():
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def _release(self, frame):
+        if self.pool is not None:
+            self.pool.release(frame)
+
+    def _read(self):
+        ret, source = self.cap.read(self._source)
+        if not ret and self.loop and self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+            ret, source = self.cap.read(self._source)
+        self._source = source if ret else None
+        return ret, source
+
+    def _grab_loop(self):
+        interval = 1.0 / self.fps
+        next_due = time.perf_counter()
+        try:
+            while not self._stop_event.is_set():
+                if self.realtime:
+                    delay = next_due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    # Never try to catch up on a stall: a camera would not
+                    next_due = max(next_due + interval, time.perf_counter() - interval)
+                t0 = time.perf_counter()
+                ret, source = self._read()
+                if not ret:
+                    break
+                t1 = time.perf_counter()
+                dst = self.pool.acquire() if self.pool is not None else None
+                frame = cv2.resize(source, self.frame_size, dst=dst)
+                t2 = time.perf_counter()
+                self.stats.add_busy(t2 - t0)
+                if self.profiler is not None:
+                    self.profiler.record("decode", t1 - t0)
+                    self.profiler.record("resize", t2 - t1)
+
+                with self._cond:
+                    if self._latest is not None:
+                        # The consumer did not keep up: replace the unread frame
+                        self._release(self._latest[1])
+                        self.frames_dropped += 1
+                    self._latest = (self.frames_read, frame, t1)
+                    self._cond.notify()
+                self.frames_read += 1
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()
+
+    def __iter__(self):
+        self.start()
+        while True:
+            t0 = time.perf_counter()
+            with self._cond:
+                while self._latest is None and not self._ended and not self._stop_event.is_set():
+                    self._cond.wait(0.1)
+                item, self._latest = self._latest, None
+            self.stats.add_starved(time.perf_counter() - t0)
+            if item is None:
+                break
+            index, frame, captured_at = item
+            if time.perf_counter() - captured_at > self.max_latency_seconds:
+                self._release(frame)
+                self.frames_dropped += 1
+                continue
+            self.last_indices = [index]
+            self.last_captured = [captured_at]
+            yield frame
+        if self._error is not None:
+            raise self._error
+
+    def batches(self, batch_size=1, stats=None):
+        """Single-frame batches: waiting to fill a batch would only add latency"""
+        for frame in self:
+            yield [frame]
+
+    def as_dict(self):
+        return {
+            "frames_read": self.frames_read,
+            "frames_dropped": self.frames_dropped,
+            "source_fps": round(self.fps, 2),
+            "realtime": self.realtime,
+            "loop": self.loop,
+        }
+
+
+class StatsBroadcaster:
+    """Fan out JSON-able events to any number of subscribers (e.g. SSE clients)
+
+    Each subscriber gets a small bounded queue; a slow one loses its oldest
+    events instead of holding up the pipeline. The latest event is replayed
+    to new subscribers so they start from the current state.
+    """
+
+    _END = object()
+
+    def __init__(self, max_queue=16):
+        self.max_queue = max_queue
+        self.last_event = None
+        self.closed = False
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _offer(q, item):
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            if self.last_event is not None:
+                q.put_nowait(self.last_event)
+            if self.closed:
+                q.put_nowait(self._END)
+            else:
+                self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event):
+        with self._lock:
+            self.last_event = event
+            for q in self._subscribers:
+                self._offer(q, event)
+
+    def close(self, event=None):
+        """Publish a final event (optional) and end every subscription"""
+        with self._lock:
+            if event is not None:
+                self.last_event = event
+            for q in self._subscribers:
+                if event is not None:
+                    self._offer(q, event)
+                self._offer(q, self._END)
+            self._subscribers.clear()
+            self.closed = True
+
+    def sse(self, heartbeat_seconds=15.0):
+        """Generator of Server-Sent Events text for one subscriber"""
+        q = self.subscribe()
+        try:
+            while True:
+                try:
+                    event = q.get(timeout=heartbeat_seconds)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is self._END:
+                    return
+                yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            self.unsubscribe(q)
@@ -0,0 +1,95 @@
+import gc
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None if it cannot be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    # No /proc (macOS): the peak is the best cheap approximation
+    return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None if it cannot be read"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryMonitor:
+    """Budgeted garbage collection instead of a gc.collect() per frame
+
+    check() samples RSS (a /proc read, a few microseconds) and runs a
+    collection only when RSS is over budget_bytes or collect_every frames
+    have passed since the last one. RSS is process-wide, so with several
+    jobs in one server process the budget applies to all of them together.
+    """
+
+    def __init__(self, budget_bytes=None, collect_every=None):
+        self.budget_bytes = budget_bytes
+        self.collect_every = collect_every
+        self.peak_rss = 0
+        self.last_rss = None
+        self.collections = 0
+        self.over_budget = 0
+        self.gc_seconds = 0.0
+        self.state_sizes = {}
+        self._last_collect_frame = 0
+
+    def check(self, frame_num, state_sizes=None):
+        """Sample memory after frame_num frames; returns True if a collection ran"""
+        if state_sizes is not None:
+            self.state_sizes = state_sizes
+        rss = current_rss_bytes()
+        self.last_rss = rss
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss, rss)
+
+        over = self.budget_bytes is not None and rss is not None and rss > self.budget_bytes
+        due = self.collect_every and frame_num - self._last_collect_frame >= self.collect_every
+        if not (over or due):
+            return False
+
+        if over:
+            self.over_budget += 1
+        t0 = time.perf_counter()
+        gc.collect()
+        self.gc_seconds += time.perf_counter() - t0
+        self.collections += 1
+        self._last_collect_frame = frame_num
+        return True
+
+    def as_dict(self):
+        process_peak = peak_rss_bytes()
+        return {
+            "peak_rss_mb": round(self.peak_rss / 1024 ** 2, 1),
+            "process_peak_rss_mb": round(process_peak / 1024 ** 2, 1) if process_peak else None,
+            "last_rss_mb": round(self.last_rss / 1024 ** 2, 1) if self.last_rss is not None else None,
+            "budget_mb": round(self.budget_bytes / 1024 ** 2, 1) if self.budget_bytes else None,
+            "collections": self.collections,
+            "over_budget": self.over_budget,
+            "gc_seconds": round(self.gc_seconds, 4),
+            "state_sizes": dict(self.state_sizes),
+        }
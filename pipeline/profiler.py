@@ -0,0 +1,163 @@
+import bisect
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from .memory import peak_rss_bytes
+
+# Upper bucket bounds in seconds: 10us doubling up to ~84s
+BUCKET_BOUNDS = 1e-5 * 2.0 ** np.arange(24)
+_BOUNDS = BUCKET_BOUNDS.tolist()  # bisect on a list beats np.searchsorted on scalars
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucket histogram of durations
+
+    Constant memory however long the clip; quantiles are interpolated
+    within a bucket, so they are accurate to about a factor of sqrt(2).
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)  # last: overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds, count=1):
+        self.counts[bisect.bisect_left(_BOUNDS, seconds)] += count
+        self.count += count
+        self.total += seconds * count
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        cumulative = np.cumsum(self.counts)
+        bucket = int(np.searchsorted(cumulative, q * self.count))
+        if bucket >= len(BUCKET_BOUNDS):
+            return self.max
+        upper = BUCKET_BOUNDS[bucket]
+        lower = BUCKET_BOUNDS[bucket - 1] if bucket > 0 else 0.0
+        before = cumulative[bucket - 1] if bucket > 0 else 0
+        fraction = (q * self.count - before) / max(self.counts[bucket], 1)
+        return float(min(lower + (upper - lower) * fraction, self.max))
+
+    def as_dict(self):
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.total / self.count) if self.count else None,
+            "p50_ms": ms(self.quantile(0.50)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99)),
+            "max_ms": ms(self.max),
+            "total_s": round(self.total, 3),
+        }
+
+
+class Profiler:
+    """Per-stage timings for one run
+
+    Stages call record(name, seconds, items); a batch of n frames is
+    recorded as n samples of seconds / n, so every histogram is per frame.
+    Optionally traces Python allocations with tracemalloc (process-wide
+    and slow, so only for debugging runs).
+    """
+
+    def __init__(self, trace_allocations=False):
+        self.histograms = {}
+        self.trace_allocations = trace_allocations
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._tracing = False
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    def record(self, name, seconds, items=1):
+        if items <= 0:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        histogram.add(seconds / items, count=items)
+
+    def stop(self):
+        """Stop allocation tracing if this profiler started it"""
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def summary(self, frames=None):
+        elapsed = time.perf_counter() - self._started
+        peak = peak_rss_bytes()
+        result = {
+            "stages": {name: histogram.as_dict() for name, histogram in list(self.histograms.items())},
+            "wall_s": round(elapsed, 3),
+            "fps": round(frames / elapsed, 2) if frames and elapsed > 0 else None,
+            "peak_rss_mb": round(peak / 1024 ** 2, 1) if peak else None,
+        }
+        if self._tracing:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            result["allocations"] = {
+                "traced_current_mb": round(current / 1024 ** 2, 2),
+                "traced_peak_mb": round(traced_peak / 1024 ** 2, 2),
+            }
+        return result
+
+
+class ProfileRegistry:
+    """Process-wide totals of finished runs, rendered as Prometheus text"""
+
+    def __init__(self, prefix="football"):
+        self.prefix = prefix
+        self.histograms = {}
+        self.runs = 0
+        self.frames = 0
+        self.last_fps = 0.0
+        self._lock = threading.Lock()
+
+    def add_run(self, profiler, frames):
+        with self._lock:
+            for name, histogram in profiler.histograms.items():
+                self.histograms.setdefault(name, LatencyHistogram()).merge(histogram)
+            self.runs += 1
+            self.frames += frames
+            self.last_fps = profiler.summary(frames)["fps"] or 0.0
+
+    def render(self, gauges=None):
+        """Prometheus text exposition format; gauges adds {name: value} extras"""
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_seconds Per-frame time spent in each pipeline stage",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = np.cumsum(histogram.counts)
+                for bound, count in zip(BUCKET_BOUNDS, cumulative):
+                    lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="{bound:.6g}"}} {count}')
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+            counters = {"runs_total": self.runs, "frames_total": self.frames}
+            values = {"last_run_fps": self.last_fps}
+        for name, value in counters.items():
+            lines += [f"# TYPE {p}_{name} counter", f"{p}_{name} {value}"]
+        for name, value in dict(values, **(gauges or {})).items():
+            lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+profile_registry = ProfileRegistry()
@@ -0,0 +1,320 @@
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+
+def plan_segments(total_frames, num_segments, min_segment_frames=1):
+    """Split [0, total_frames) into up to num_segments contiguous (start, end) ranges"""
+    num_segments = max(1, min(num_segments, total_frames // max(min_segment_frames, 1)))
+    bounds = np.linspace(0, total_frames, num_segments + 1).astype(int)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def box_iou(boxes_a, boxes_b):
+    """(N, M) IoU matrix between two sets of xyxy boxes"""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+    w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = w * h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def match_tracks(tail, head, min_iou=0.5, min_frames=1):
+    """Match track ids across a segment boundary by their boxes on shared frames
+
+    tail is the earlier segment's last frames and head the later segment's
+    warm-up frames ({track_id: bbox} per frame, both ending on the frame
+    before the boundary). Pairs are scored by mean IoU over the frames both
+    tracks appear in and matched greedily, best first. Returns
+    {head_id: tail_id}.
+    """
+    iou_sum, both = {}, {}
+    for tail_boxes, head_boxes in zip(reversed(tail), reversed(head)):
+        if not tail_boxes or not head_boxes:
+            continue
+        tail_ids, head_ids = list(tail_boxes), list(head_boxes)
+        ious = box_iou([tail_boxes[t] for t in tail_ids], [head_boxes[h] for h in head_ids])
+        for i, tail_id in enumerate(tail_ids):
+            for j, head_id in enumerate(head_ids):
+                key = (head_id, tail_id)
+                iou_sum[key] = iou_sum.get(key, 0.0) + ious[i, j]
+                both[key] = both.get(key, 0) + 1
+
+    scored = sorted(
+        ((iou_sum[key] / both[key], key) for key in iou_sum if both[key] >= min_frames),
+        reverse=True
+    )
+    matches, used_tail = {}, set()
+    for score, (head_id, tail_id) in scored:
+        if score < min_iou:
+            break
+        if head_id in matches or tail_id in used_tail:
+            continue
+        matches[head_id] = tail_id
+        used_tail.add(tail_id)
+    return matches
+
+
+def team_mapping(reference_colors, colors):
+    """{segment team: reference team}, swapping 1 and 2 if the kits came out reversed"""
+    if not reference_colors or not colors or set(colors) != set(reference_colors):
+        return {}
+    ref = {team: np.asarray(color) for team, color in reference_colors.items()}
+    own = {team: np.asarray(color) for team, color in colors.items()}
+    if set(own) != {"1", "2"}:
+        return {}
+    same = np.linalg.norm(own["1"] - ref["1"]) + np.linalg.norm(own["2"] - ref["2"])
+    swapped = np.linalg.norm(own["1"] - ref["2"]) + np.linalg.norm(own["2"] - ref["1"])
+    return {"1": "2", "2": "1"} if swapped < same else {}
+
+
+def concat_videos(paths, output_path, fps, frame_size=(640, 360)):
+    """Join segment outputs in order: stream copy with ffmpeg if present, else re-encode"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is not None:
+        list_path = output_path + ".parts.txt"
+        with open(list_path, "w") as f:
+            for path in paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            completed = subprocess.run(
+                [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", output_path],
+                capture_output=True
+            )
+            if completed.returncode == 0:
+                return "ffmpeg"
+        finally:
+            os.remove(list_path)
+
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"XVID"), fps, frame_size)
+    frame = None
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        while True:
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            out.write(frame)
+        cap.release()
+    out.release()
+    return "opencv"
+
+
+def _init_segment_worker(threads):
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _run_segment(process_fn, input_path, output_path, options):
+    # Each worker process loads (and warms) its own model on first use
+    return process_fn(input_path, output_path, **options)
+
+
+def stitch_segments(results):
+    """Per segment: ({local track id: global id}, {segment team: reference team}, tracks joined)
+
+    Segment 0 defines the global track ids; later segments inherit them
+    through the overlap or get fresh ones. Team numbers come from
+    independent clusterings and are aligned to the first segment's kits.
+    """
+    reference_colors = None
+    stitching = []
+    mapping_prev = {}
+    next_id = 1 + max(
+        (int(track_id) for result in results for track_id in result["segment"]["player_distances"]),
+        default=0
+    )
+    for k, result in enumerate(results):
+        segment = result["segment"]
+        local_ids = set(map(int, segment["player_distances"]))
+        local_ids.update(map(int, (result.get("analytics") or {}).get("players", {})))
+        for boxes in segment["tail"]:
+            local_ids.update(boxes)
+
+        inherited = 0
+        if k == 0:
+            mapping = {track_id: track_id for track_id in local_ids}
+        else:
+            head = [{int(t): b for t, b in boxes.items()} for boxes in segment["head"]]
+            tail = [{int(t): b for t, b in boxes.items()} for boxes in results[k - 1]["segment"]["tail"]]
+            matches = match_tracks(tail, head, min_frames=max(1, len(head) // 4))
+            mapping = {}
+            for track_id in sorted(local_ids | set(matches)):
+                if track_id in matches and matches[track_id] in mapping_prev:
+                    mapping[track_id] = mapping_prev[matches[track_id]]
+                    inherited += 1
+                else:
+                    mapping[track_id] = next_id
+                    next_id += 1
+        mapping_prev = mapping
+
+        if reference_colors is None and segment["team_colors"]:
+            reference_colors = segment["team_colors"]
+        stitching.append((mapping, team_mapping(reference_colors, segment["team_colors"]), inherited))
+    return stitching
+
+
+def merge_segment_results(results, output_name):
+    """Stitch per-segment results into one: global track ids, distances, possession"""
+    possession_counts = {}
+    distances = {}
+    segments = []
+    for result, (mapping, teams, inherited) in zip(results, stitch_segments(results)):
+        segment = result["segment"]
+        for track_id, distance in segment["player_distances"].items():
+            global_id = mapping.get(int(track_id), int(track_id))
+            distances[global_id] = distances.get(global_id, 0.0) + distance
+
+        for team, count in result["possession"]["frame_counts"].items():
+            team = teams.get(team, team)
+            possession_counts[team] = possession_counts.get(team, 0) + count
+
+        segments.append({
+            "start_frame": segment["start_frame"],
+            "end_frame": segment["end_frame"],
+            "warmup_frames": segment["warmup_frames"],
+            "team_swapped": bool(teams),
+            "tracks": len(mapping),
+            "tracks_joined": inherited,
+            "pipeline_stats": result.get("pipeline_stats"),
+            "memory": result.get("memory"),
+            "profile": result.get("profile"),
+        })
+
+    total = sum(possession_counts.values())
+    return {
+        "processed_video_url": output_name,
+        "possession": {
+            "frames": total,
+            "frame_counts": possession_counts,
+            "percentages": {
+                team: round(count / total * 100, 2) if total else 0.0
+                for team, count in possession_counts.items()
+            },
+        },
+        "player_distances": {str(track_id): round(d, 2) for track_id, d in sorted(distances.items())},
+        "segments": segments,
+    }
+
+
+def concat_analytics(paths, results, output_path, fps):
+    """Join per-segment Parquet tables into one, in global track ids, team numbers and clip time"""
+    import pandas as pd
+
+    tables = []
+    for path, result, (mapping, teams, _) in zip(paths, results, stitch_segments(results)):
+        table = pd.read_parquet(path)
+        # Possession-only rows have no track id (NaN)
+        table["track_id"] = table["track_id"].map(lambda tid: mapping.get(int(tid), tid) if tid == tid else tid)
+        table["team"] = table["team"].map(lambda team: int(teams.get(str(int(team)), team)) if team == team else team)
+        table = table.rename(columns={f"possession_{team}": f"possession_{ref}" for team, ref in teams.items()})
+        table["t"] = (table["t"] + result["segment"]["start_frame"] / fps).round(3)
+        tables.append(table)
+    table = pd.concat(tables, ignore_index=True).sort_values(["t", "track_id"])
+    table.to_parquet(output_path, index=False)
+    return output_path
+
+
+def process_video_segmented(process_fn, input_path, output_path, max_workers=None,
+                            overlap_seconds=2.0, min_segment_seconds=60.0,
+                            progress_callback=None, model=None, **options):
+    """Process a long clip as overlapping time segments in parallel processes
+
+    Each segment is a process_fn run over [start, end) that first follows
+    the camera from frame 0 (decode and optical flow only, so later
+    segments spend a share of their time on it) and warms up on
+    overlap_seconds of the previous segment. The results are stitched:
+    track ids are joined across the overlaps by IoU, per-track distances
+    and possession counts are summed (with team numbers aligned by kit
+    colour) and the segment videos are concatenated. Overlays in the video
+    show segment-local track ids and distances; the returned statistics
+    are global, as is the joined Parquet table of an analytics_format="parquet"
+    run. Clips shorter than two segments, and live sources, run
+    serially in-process.
+    """
+    if options.get("live"):
+        return process_fn(input_path, output_path, progress_callback=progress_callback,
+                          model=model, **options)
+
+    cap = cv2.VideoCapture(input_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 24
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    max_workers = max_workers or os.cpu_count() or 1
+    plan = plan_segments(total_frames, max_workers, min_segment_frames=int(min_segment_seconds * fps))
+    if len(plan) < 2:
+        return process_fn(input_path, output_path, progress_callback=progress_callback,
+                          model=model, **options)
+
+    output_path = output_path.replace(".mp4", ".avi")
+    base, ext = os.path.splitext(output_path)
+    overlap_frames = int(overlap_seconds * fps)
+    options = dict(options, cache_dir=None, overlap_frames=overlap_frames)
+    part_paths = [f"{base}.part{k:03d}{ext}" for k in range(len(plan))]
+    # Where each segment writes its Parquet table (analytics_format="parquet")
+    part_analytics = [f"{base}.part{k:03d}_analytics.parquet" for k in range(len(plan))]
+
+    t0 = time.perf_counter()
+    results = [None] * len(plan)
+    frames_done = 0
+    # spawn: forked children would inherit the parent's torch thread pools
+    context = multiprocessing.get_context("spawn")
+    threads = max(1, (os.cpu_count() or 1) // len(plan))
+    try:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(plan)), mp_context=context,
+                                 initializer=_init_segment_worker, initargs=(threads,)) as pool:
+            futures = {
+                pool.submit(_run_segment, process_fn, input_path, part_path,
+                            dict(options, start_frame=start, end_frame=end)): k
+                for k, ((start, end), part_path) in enumerate(zip(plan, part_paths))
+            }
+            for future in as_completed(futures):
+                k = futures[future]
+                result = future.result()
+                if result.get("error"):
+                    raise RuntimeError(f"Segment {k} {plan[k]}: {result['error']}")
+                results[k] = result
+                frames_done += plan[k][1] - plan[k][0]
+                if progress_callback is not None:
+                    progress_callback(frames_done, total_frames)
+
+        if options.get("analytics_only"):
+            # Per-segment analytics keep segment-local track ids; the global
+            # per-track distances are in merged["player_distances"], and a
+            # Parquet series is joined into one table in global ids
+            merged = merge_segment_results(results, None)
+            merged["analytics"] = {"segments": [result.get("analytics") for result in results]}
+            if options.get("analytics_format") == "parquet":
+                analytics_path = concat_analytics(part_analytics, results, f"{base}_analytics.parquet", fps)
+                merged["analytics_url"] = os.path.basename(analytics_path)
+        else:
+            merged = merge_segment_results(results, os.path.basename(output_path))
+            merged["concat"] = concat_videos(part_paths, output_path, fps)
+        merged["parallel"] = {
+            "segments": len(plan),
+            "workers": min(max_workers, len(plan)),
+            "overlap_frames": overlap_frames,
+            "seconds": round(time.perf_counter() - t0, 2),
+        }
+        return merged
+    except Exception as e:
+        print(f"Segmented processing error: {e}")
+        return {"error": str(e)}
+    finally:
+        for path in part_paths + part_analytics:
+            if os.path.exists(path):
+                os.remove(path)
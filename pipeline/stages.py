@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+
+
+class StageStats:
+    """Occupancy counters for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_time = 0.0      # doing the stage's own work
+        self.starved_time = 0.0   # waiting for input from upstream
+        self.blocked_time = 0.0   # waiting for room in the downstream queue
+        self.queue_depth_sum = 0
+        self.queue_depth_max = 0
+        self.queue_samples = 0
+
+    def add_busy(self, seconds, items=1):
+        self.busy_time += seconds
+        self.items += items
+
+    def add_starved(self, seconds):
+        self.starved_time += seconds
+
+    def add_blocked(self, seconds):
+        self.blocked_time += seconds
+
+    def sample_queue(self, depth):
+        """Record the depth of the stage's input queue"""
+        self.queue_depth_sum += depth
+        self.queue_samples += 1
+        if depth > self.queue_depth_max:
+            self.queue_depth_max = depth
+
+    def occupancy(self):
+        """Fraction of wall time spent doing work"""
+        total = self.busy_time + self.starved_time + self.blocked_time
+        return self.busy_time / total if total > 0 else 0.0
+
+    def as_dict(self):
+        mean_depth = self.queue_depth_sum / self.queue_samples if self.queue_samples else 0.0
+        return {
+            "items": self.items,
+            "busy_s": round(self.busy_time, 3),
+            "starved_s": round(self.starved_time, 3),
+            "blocked_s": round(self.blocked_time, 3),
+            "occupancy": round(self.occupancy(), 3),
+            "queue_depth_mean": round(mean_depth, 2),
+            "queue_depth_max": self.queue_depth_max,
+        }
+
+
+def bottleneck_stage(stats_list):
+    """Name of the stage with the highest occupancy"""
+    if not stats_list:
+        return None
+    return max(stats_list, key=lambda s: s.occupancy()).name
+
+
+class FrameWriter:
+    """Encode frames on a background thread fed by a bounded queue
+
+    With a FramePool, each frame's buffer is released back to it once
+    encoded, so the writer is the last owner of a pooled frame.
+    """
+
+    _END = object()
+
+    def __init__(self, out, max_queue=32, threaded=True, pool=None, profiler=None):
+        self.out = out
+        self.profiler = profiler
+        self.threaded = threaded
+        self.pool = pool
+        self.stats = StageStats("encode")
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        if threaded:
+            self._thread.start()
+
+    def _write_loop(self):
+        while True:
+            t0 = time.perf_counter()
+            frame = self.queue.get()
+            t1 = time.perf_counter()
+            self.stats.add_starved(t1 - t0)
+            if frame is self._END:
+                break
+            if self._error is not None:
+                continue  # drain so the producer never blocks forever
+            try:
+                self.out.write(frame)
+            except Exception as e:
+                self._error = e
+            self._release(frame)
+            self._add_busy(time.perf_counter() - t1)
+
+    def _add_busy(self, seconds):
+        self.stats.add_busy(seconds)
+        if self.profiler is not None:
+            self.profiler.record("encode", seconds)
+
+    def _release(self, frame):
+        if self.pool is not None:
+            self.pool.release(frame)
+
+    def write(self, frame):
+        """Queue a frame for encoding; returns seconds spent blocked"""
+        if self._error is not None:
+            raise self._error
+        if not self.threaded:
+            t0 = time.perf_counter()
+            self.out.write(frame)
+            self._release(frame)
+            self._add_busy(time.perf_counter() - t0)
+            return 0.0
+        self.stats.sample_queue(self.queue.qsize())
+        t0 = time.perf_counter()
+        self.queue.put(frame)
+        return time.perf_counter() - t0
+
+    def close(self):
+        """Flush queued frames and stop the encoder thread"""
+        if self.threaded and self._thread.is_alive():
+            self.queue.put(self._END)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def stop(self):
+        """Stop the encoder thread without raising (cleanup path)"""
+        if self.threaded and self._thread.is_alive():
+            self.queue.put(self._END)
+            self._thread.join(timeout=5)
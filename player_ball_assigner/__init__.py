@@ -1 +1,2 @@
 from .player_ball_assigner import PlayerBallAssigner
+from .ball_possession import TeamBallPossession
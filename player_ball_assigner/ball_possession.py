@@ -0,0 +1,67 @@
+from collections import deque
+
+
+class TeamBallPossession:
+    """Running per-team possession counts with O(1) update and read"""
+
+    def __init__(self, window_frames=None, teams=(1, 2)):
+        self.teams = tuple(teams)
+        self.counts = {team: 0 for team in self.teams}
+        self.total = 0
+        self.last_team = None
+
+        # Optional sliding window, e.g. the last 5 minutes of frames
+        self.window_frames = window_frames
+        self.window = deque() if window_frames else None
+        self.window_counts = {team: 0 for team in self.teams}
+
+    def __len__(self):
+        return self.total
+
+    def reset(self):
+        """Zero all counts but remember who had the ball last"""
+        self.counts = {team: 0 for team in self.teams}
+        self.total = 0
+        if self.window is not None:
+            self.window.clear()
+        self.window_counts = {team: 0 for team in self.teams}
+
+    def update(self, team):
+        """Record the team in possession for one frame"""
+        self.counts[team] = self.counts.get(team, 0) + 1
+        self.total += 1
+        self.last_team = team
+
+        if self.window is not None:
+            self.window.append(team)
+            self.window_counts[team] = self.window_counts.get(team, 0) + 1
+            if len(self.window) > self.window_frames:
+                dropped = self.window.popleft()
+                self.window_counts[dropped] -= 1
+
+    def update_previous(self, default_team=1):
+        """Carry the last known team forward when nobody has the ball"""
+        self.update(self.last_team if self.last_team is not None else default_team)
+
+    def percentages(self, windowed=False):
+        """Possession percentage per team, over the window if requested"""
+        if windowed and self.window is not None:
+            counts, total = self.window_counts, len(self.window)
+        else:
+            counts, total = self.counts, self.total
+        if total == 0:
+            return {team: 0.0 for team in self.teams}
+        return {team: counts.get(team, 0) / total * 100 for team in self.teams}
+
+    def as_dict(self):
+        result = {
+            "frames": self.total,
+            "frame_counts": {str(team): self.counts.get(team, 0) for team in self.teams},
+            "percentages": {str(team): round(pct, 2) for team, pct in self.percentages().items()},
+        }
+        if self.window is not None:
+            result["window_frames"] = self.window_frames
+            result["window_percentages"] = {
+                str(team): round(pct, 2) for team, pct in self.percentages(windowed=True).items()
+            }
+        return result
@@ -7,28 +7,113 @@ def measure_distance(point1, point2):
     return np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
 
 
+def foot_ball_distances(player_bboxes, ball_centers):
+    """Distance from each player's nearer foot to the ball.
+
+    player_bboxes is (..., N, 4) and ball_centers is (..., 2); NaN rows
+    (padding or a missing ball) come out as +inf.
+    """
+    player_bboxes = np.asarray(player_bboxes, dtype=np.float64)
+    ball_centers = np.asarray(ball_centers, dtype=np.float64)[..., None, :]
+    dy = player_bboxes[..., 3] - ball_centers[..., 1]
+    dx_left = player_bboxes[..., 0] - ball_centers[..., 0]
+    dx_right = player_bboxes[..., 2] - ball_centers[..., 0]
+    distances = np.sqrt(np.minimum(dx_left ** 2, dx_right ** 2) + dy ** 2)
+    return np.where(np.isnan(distances), np.inf, distances)
+
+
 class PlayerBallAssigner:
-    def __init__(self):
+    def __init__(self, switch_margin=0.0, min_switch_frames=1):
         self.max_player_ball_distance = 70
+        
+        # Hysteresis: a challenger must be switch_margin px closer than the
+        # current owner for min_switch_frames frames in a row to take over
+        self.switch_margin = switch_margin
+        self.min_switch_frames = min_switch_frames
+        self.current_owner = -1
+        self._challenger = -1
+        self._challenger_frames = 0
+    
+    def assign_ball_to_player_bboxes(self, player_bboxes, ball_bbox):
+        """Index into an (N, 4) bbox array of the player owning the ball, or -1"""
+        if ball_bbox is None or len(player_bboxes) == 0:
+            return -1
+        ball_bbox = np.asarray(ball_bbox, dtype=np.float64)
+        ball_center = (ball_bbox[:2] + ball_bbox[2:]) / 2
+        distances = foot_ball_distances(player_bboxes, ball_center)
+        closest = int(np.argmin(distances))
+        return closest if distances[closest] < self.max_player_ball_distance else -1
     
     def assign_ball_to_player(self, players, ball_bbox):
-        if ball_bbox is None:
+        if ball_bbox is None or len(players) == 0:
+            return -1
+        player_ids = list(players)
+        player_bboxes = np.array([player["bbox"] for player in players.values()])
+        closest = self.assign_ball_to_player_bboxes(player_bboxes, ball_bbox)
+        return player_ids[closest] if closest != -1 else -1
+    
+    def assign_ball_batch(self, player_bboxes, ball_bboxes, track_ids=None, hysteresis=False):
+        """Ball owner for a batch of frames in one pass.
+        
+        player_bboxes is (F, N, 4) padded with NaN, ball_bboxes is (F, 4)
+        with NaN rows where the ball is missing. Returns (F,) player indices,
+        or track ids if track_ids (F, N) is given; -1 where nobody owns it.
+        """
+        ball_bboxes = np.asarray(ball_bboxes, dtype=np.float64)
+        ball_centers = (ball_bboxes[:, :2] + ball_bboxes[:, 2:]) / 2
+        distances = foot_ball_distances(player_bboxes, ball_centers)
+        distances[distances >= self.max_player_ball_distance] = np.inf
+        
+        if distances.shape[1] == 0:
+            return np.full(len(distances), -1)
+        
+        if not hysteresis:
+            closest = distances.argmin(axis=1)
+            owned = np.isfinite(distances[np.arange(len(distances)), closest])
+            if track_ids is not None:
+                closest = np.asarray(track_ids)[np.arange(len(distances)), closest]
+            return np.where(owned, closest, -1)
+        
+        ids = np.asarray(track_ids) if track_ids is not None else np.broadcast_to(
+            np.arange(distances.shape[1]), distances.shape
+        )
+        return np.array([self._update_owner(ids[f], distances[f]) for f in range(len(distances))])
+    
+    def _update_owner(self, track_ids, distances):
+        """Apply hysteresis to one frame of cut-off distances (inf = out of range)"""
+        if len(distances) == 0 or not np.isfinite(distances).any():
+            self._challenger, self._challenger_frames = -1, 0
             return -1
-        ball_pos = (int((ball_bbox[0] + ball_bbox[2]) / 2), int((ball_bbox[1] + ball_bbox[3]) / 2))
-        
-        min_dist = np.inf
-        closest_player = -1
-        
-        for player_id, player in players.items():
-            player_bbox = player["bbox"]
-            
-            distance_left = measure_distance((player_bbox[0], player_bbox[-1]), ball_pos)
-            distance_right = measure_distance((player_bbox[2], player_bbox[-1]), ball_pos)
-            
-            distance = min(distance_left, distance_right)
-            
-            if distance < self.max_player_ball_distance and distance < min_dist:
-                min_dist = distance
-                closest_player = player_id
-                
-        return closest_player
\ No newline at end of file
+        
+        closest = int(np.argmin(distances))
+        best_id = track_ids[closest]
+        
+        current = np.flatnonzero(track_ids == self.current_owner)
+        if self.current_owner == -1 or len(current) == 0 or not np.isfinite(distances[current[0]]):
+            self.current_owner = best_id
+            self._challenger, self._challenger_frames = -1, 0
+            return self.current_owner
+        
+        if best_id != self.current_owner and distances[closest] + self.switch_margin < distances[current[0]]:
+            if best_id == self._challenger:
+                self._challenger_frames += 1
+            else:
+                self._challenger, self._challenger_frames = best_id, 1
+            if self._challenger_frames >= self.min_switch_frames:
+                self.current_owner = best_id
+                self._challenger, self._challenger_frames = -1, 0
+        else:
+            self._challenger, self._challenger_frames = -1, 0
+        
+        return self.current_owner
+    
+    def update_owner(self, track_ids, player_bboxes, ball_bbox):
+        """Streaming ball owner (track id or -1) for one frame, with hysteresis"""
+        track_ids = np.asarray(track_ids)
+        if ball_bbox is None or len(track_ids) == 0:
+            return self._update_owner(track_ids, np.empty(0))
+        ball_bbox = np.asarray(ball_bbox, dtype=np.float64)
+        distances = foot_ball_distances(player_bboxes, (ball_bbox[:2] + ball_bbox[2:]) / 2)
+        distances[distances >= self.max_player_ball_distance] = np.inf
+        owner = self._update_owner(track_ids, distances)
+        return int(owner)
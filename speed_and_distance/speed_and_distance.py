@@ -2,58 +2,158 @@ import cv2
 import numpy as np
 
 class SpeedAndDistance_Estimator:
-    def __init__(self, frame_rate=24):
+    def __init__(self, frame_rate=24, max_missing_frames=48, max_retired_tracks=4096):
         self.frame_window = 5
         self.frame_rate = frame_rate
         self.pixel_to_meter_ratio = 0.05 # Example: 1 pixel = 5cm
+        self.max_missing_frames = max_missing_frames
+        
+        # Per-track state kept between calls so streamed frames accumulate
+        self.frame_num = 0
+        self.track_state = {}
+        self._last_eviction = 0
+        # Distance of evicted tracks, so totals survive eviction. Bounded for
+        # live streams with ID churn: past max_retired_tracks the oldest are
+        # folded into one total and can no longer be looked up by id
+        self.max_retired_tracks = max_retired_tracks
+        self.retired_distance = {}
+        self.folded_distance = 0.0
+        self.folded_tracks = 0
     
-    def add_speed_and_distance(self, tracks):
-        """Calculate speed and distance for each player"""
+    def reset(self):
+        """Forget all per-track state"""
+        self.frame_num = 0
+        self.track_state = {}
+        self._last_eviction = 0
+        self.retired_distance = {}
+        self.folded_distance = 0.0
+        self.folded_tracks = 0
+    
+    def total_distances(self):
+        """{track_id: total distance} over every track seen so far, except folded ones"""
+        totals = dict(self.retired_distance)
+        for track_id, state in self.track_state.items():
+            totals[track_id] = totals.get(track_id, 0.0) + state["distance"]
+        return totals
+    
+    def _new_track_state(self, position):
+        # Ring buffer of (frame_num, cumulative distance) over the speed window
+        return {
+            "history": np.zeros((self.frame_window + 1, 2), dtype=np.float64),
+            "head": 0,
+            "count": 0,
+            "last_position": np.array(position, dtype=np.float64),
+            "distance": 0.0,
+            "last_seen": self.frame_num,
+        }
+    
+    def _update_track(self, track_id, position, meters_per_unit):
+        """Update one track and return (speed_kmh or None, total distance)"""
+        state = self.track_state.get(track_id)
+        if state is None:
+            state = self._new_track_state(position)
+            self.track_state[track_id] = state
+        else:
+            step = np.array(position, dtype=np.float64) - state["last_position"]
+            state["distance"] += float(np.hypot(step[0], step[1])) * meters_per_unit
+            state["last_position"][:] = position
+        state["last_seen"] = self.frame_num
+        
+        history = state["history"]
+        history[state["head"]] = (self.frame_num, state["distance"])
+        state["head"] = (state["head"] + 1) % len(history)
+        state["count"] = min(state["count"] + 1, len(history))
+        
+        if state["count"] < 2:
+            return None, state["distance"]
+        
+        # Oldest sample in the window vs. the one just written
+        oldest = history[state["head"] % len(history)] if state["count"] == len(history) else history[0]
+        frames_elapsed = self.frame_num - oldest[0]
+        if frames_elapsed <= 0:
+            return None, state["distance"]
+        time_elapsed = float(frames_elapsed) / self.frame_rate
+        speed_ms = (state["distance"] - float(oldest[1])) / time_elapsed
+        return speed_ms * 3.6, state["distance"]
+    
+    def _evict_stale_tracks(self):
+        # Amortised: scan at most once every max_missing_frames frames
+        if self.frame_num - self._last_eviction < self.max_missing_frames:
+            return
+        cutoff = self.frame_num - self.max_missing_frames
+        stale = [tid for tid, state in self.track_state.items() if state["last_seen"] < cutoff]
+        for track_id in stale:
+            state = self.track_state.pop(track_id)
+            # Re-insert, so the dict stays ordered oldest eviction first
+            distance = self.retired_distance.pop(track_id, 0.0) + state["distance"]
+            self.retired_distance[track_id] = distance
+        while len(self.retired_distance) > self.max_retired_tracks:
+            track_id = next(iter(self.retired_distance))
+            self.folded_distance += self.retired_distance.pop(track_id)
+            self.folded_tracks += 1
+        self._last_eviction = self.frame_num
+    
+    def update_frame(self, track_ids, positions, meters_per_unit=1.0, frame_num=None):
+        """Advance one frame from columnar data
         
-        total_distances = {}
-        previous_positions = {}
+        positions is an (N, 2) array aligned with track_ids. Returns
+        (speeds_kmh, distances) arrays; speed is NaN until a track has two
+        samples. Pass the source frame_num when frames were skipped (live
+        streams drop frames), so speeds use the real elapsed time.
+        """
+        if frame_num is not None:
+            self.frame_num = frame_num
+        speeds = np.full(len(track_ids), np.nan, dtype=np.float32)
+        distances = np.zeros(len(track_ids), dtype=np.float32)
         
-        for object_type, object_tracks in tracks.items():
-            if object_type == "ball" or object_type == "referees":
+        for i, (track_id, position) in enumerate(zip(track_ids, positions)):
+            if np.isnan(position[0]):
+                speeds[i] = distances[i] = np.nan
                 continue
-            
-            for frame_num, frame_tracks in enumerate(object_tracks):
-                for track_id, track_info in frame_tracks.items():
+            speed_kmh, distances[i] = self._update_track(track_id, position, meters_per_unit)
+            if speed_kmh is not None:
+                speeds[i] = speed_kmh
+        
+        self.frame_num += 1
+        self._evict_stale_tracks()
+        return speeds, distances
+    
+    def add_speed_and_distance(self, tracks):
+        """Calculate speed and distance for each player
+        
+        Per-track state persists between calls, so tracks may be passed in
+        as the whole clip or one frame at a time.
+        """
+        object_tracks = tracks.get("players", [])
+        
+        for frame_tracks in object_tracks:
+            for track_id, track_info in frame_tracks.items():
+                # Pitch coordinates from ViewTransformer are already in metres
+                position = track_info.get("position_transformed")
+                meters_per_unit = 1.0
+                if position is None:
                     position = track_info.get("position_adjusted", track_info.get("position"))
-                    if position is None:
-                        continue
-                    
-                    if track_id in previous_positions:
-                        prev_pos = previous_positions[track_id]
-                        distance_pixels = np.linalg.norm(np.array(position) - np.array(prev_pos))
-                        distance_meters = distance_pixels * self.pixel_to_meter_ratio
-                        
-                        if track_id not in total_distances:
-                            total_distances[track_id] = 0
-                        total_distances[track_id] += distance_meters
-                        
-                        # Speed calculation over a window for stability
-                        time_elapsed = 1 / self.frame_rate
-                        speed_ms = distance_meters / time_elapsed if time_elapsed > 0 else 0
-                        speed_kmh = speed_ms * 3.6
-                        
-                        # Use a running average for speed to smooth it out
-                        if "speed" in track_info:
-                            track_info["speed"] = (track_info["speed"] + speed_kmh) / 2
-                        else:
-                            track_info["speed"] = speed_kmh
-                    
-                    previous_positions[track_id] = position
-                    track_info["distance"] = total_distances.get(track_id, 0)
+                    meters_per_unit = self.pixel_to_meter_ratio
+                if position is None:
+                    continue
+                
+                speed_kmh, distance = self._update_track(track_id, position, meters_per_unit)
+                if speed_kmh is not None:
+                    track_info["speed"] = speed_kmh
+                track_info["distance"] = distance
+            
+            self.frame_num += 1
+            self._evict_stale_tracks()
     
-    def draw_speed_and_distance(self, frames, tracks, specific_frame_num=None):
-        """Draw speed and distance information on frames"""
+    def draw_speed_and_distance(self, frames, tracks, specific_frame_num=None, in_place=False):
+        """Draw speed and distance information on frames (in_place=True draws on the given frames)"""
         output_frames = []
         
         start_frame = specific_frame_num if specific_frame_num is not None else 0
         for i, frame in enumerate(frames):
             frame_num = start_frame + i
-            frame = frame.copy()
+            if not in_place:
+                frame = frame.copy()
             
             player_dict = tracks["players"][frame_num]
             
@@ -1,12 +1,36 @@
+from collections import OrderedDict, deque
 from sklearn.cluster import KMeans
 import cv2
 import numpy as np
 
 class TeamAssigner:
-    def __init__(self):
+    def __init__(self, color_sample_size=(16, 16), color_iterations=5,
+                 warmup_frames=10, refit_every=250, max_color_samples=500,
+                 min_confidence=0.7, revote_every=25, max_missing_frames=150):
         self.team_colors = {}
         self.player_team_dict = {}
         self.kmeans = None
+        self.team_centers = None
+        
+        # Jersey crops are resampled to a fixed (w, h) grid so a whole frame's
+        # players can be clustered in one vectorised pass
+        self.color_sample_size = color_sample_size
+        self.color_iterations = color_iterations
+        
+        # Online model: fit after warmup_frames, refit every refit_every frames
+        # on a bounded buffer of recent jersey colors
+        self.warmup_frames = warmup_frames
+        self.refit_every = refit_every
+        self.color_samples = deque(maxlen=max_color_samples)
+        self.frame_num = 0
+        self.last_fit_frame = None
+        
+        # Per-track votes, re-voted while below min_confidence and evicted
+        # once unseen for max_missing_frames (least recently seen first)
+        self.min_confidence = min_confidence
+        self.revote_every = revote_every
+        self.max_missing_frames = max_missing_frames
+        self.player_state = OrderedDict()
         
     def get_clustering_model(self, image):
         """Create K-means clustering model for team colors"""
@@ -40,27 +64,120 @@ class TeamAssigner:
         player_color = kmeans.cluster_centers_[player_cluster]
         return player_color
     
+    def get_jersey_pixels(self, frame, bboxes):
+        """Sample the top half of each bbox onto a fixed grid
+        
+        Returns an (N, h*w, 3) float32 array and a boolean mask of crops
+        that were non-empty.
+        """
+        w, h = self.color_sample_size
+        pixels = np.zeros((len(bboxes), h * w, 3), dtype=np.float32)
+        valid = np.zeros(len(bboxes), dtype=bool)
+        
+        frame_h, frame_w = frame.shape[:2]
+        for i, bbox in enumerate(bboxes):
+            x1, y1, x2, y2 = map(int, bbox)
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, frame_w), min(y2, frame_h)
+            top_half = frame[y1:y1 + int((y2 - y1) / 2), x1:x2]
+            if top_half.size == 0:
+                continue
+            sample = cv2.resize(top_half, (w, h), interpolation=cv2.INTER_NEAREST)
+            pixels[i] = sample.reshape(-1, 3)
+            valid[i] = True
+        
+        return pixels, valid
+    
+    def get_player_colors(self, frame, bboxes):
+        """Extract the dominant jersey color for every bbox in one pass
+        
+        Runs a fixed-iteration 2-means over all crops at once, seeded with
+        the crop corners (background) and the pixel farthest from them.
+        Returns an (N, 3) array; rows for empty crops are NaN.
+        """
+        colors = np.full((len(bboxes), 3), np.nan)
+        if len(bboxes) == 0:
+            return colors
+        
+        pixels, valid = self.get_jersey_pixels(frame, bboxes)
+        pixels = pixels[valid]
+        if len(pixels) == 0:
+            return colors
+        
+        w, h = self.color_sample_size
+        n = len(pixels)
+        rows = np.arange(n)
+        corners = np.array([0, w - 1, (h - 1) * w, h * w - 1])
+        
+        background = pixels[:, corners].mean(axis=1)
+        dist_bg = ((pixels - background[:, None, :]) ** 2).sum(axis=2)
+        centers = np.stack([background, pixels[rows, dist_bg.argmax(axis=1)]], axis=1)
+        
+        for _ in range(self.color_iterations):
+            dist = ((pixels[:, :, None, :] - centers[:, None, :, :]) ** 2).sum(axis=3)
+            labels = dist.argmin(axis=2)
+            in_1 = (labels == 1).astype(np.float32)
+            count_1 = in_1.sum(axis=1)
+            count_0 = pixels.shape[1] - count_1
+            sum_1 = (pixels * in_1[:, :, None]).sum(axis=1)
+            sum_0 = pixels.sum(axis=1) - sum_1
+            centers[:, 0] = np.where(count_0[:, None] > 0, sum_0 / np.maximum(count_0, 1)[:, None], centers[:, 0])
+            centers[:, 1] = np.where(count_1[:, None] > 0, sum_1 / np.maximum(count_1, 1)[:, None], centers[:, 1])
+        
+        dist = ((pixels[:, :, None, :] - centers[:, None, :, :]) ** 2).sum(axis=3)
+        labels = dist.argmin(axis=2)
+        
+        # Same rule as get_player_color: the corners' majority is background
+        non_player_cluster = (labels[:, corners].sum(axis=1) > 2).astype(int)
+        player_cluster = 1 - non_player_cluster
+        colors[valid] = centers[rows, player_cluster]
+        return colors
+    
+    def fit_team_colors(self, player_colors):
+        """Cluster jersey colors into two teams, keeping team ids stable"""
+        player_colors = np.asarray(player_colors, dtype=np.float64)
+        kmeans = KMeans(n_clusters=2, init='k-means++', n_init=10)
+        kmeans.fit(player_colors)
+        centers = kmeans.cluster_centers_
+        
+        # On a refit, keep each team id on the center nearest its old color
+        if self.team_centers is not None:
+            kept = np.linalg.norm(centers - self.team_centers, axis=1).sum()
+            swapped = np.linalg.norm(centers[::-1] - self.team_centers, axis=1).sum()
+            if swapped < kept:
+                centers = centers[::-1]
+        
+        self.kmeans = kmeans
+        self.team_centers = centers.copy()
+        self.team_colors[1] = self.team_centers[0]
+        self.team_colors[2] = self.team_centers[1]
+    
+    def predict_teams(self, colors):
+        """Team id and confidence for each (N, 3) color
+        
+        Confidence is d_other / (d_own + d_other): 0.5 when a color sits
+        halfway between the two team colors, 1.0 on a team color.
+        """
+        colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+        dist = np.linalg.norm(colors[:, None, :] - self.team_centers[None, :, :], axis=2)
+        cluster = dist.argmin(axis=1)
+        rows = np.arange(len(colors))
+        total = dist.sum(axis=1)
+        confidence = np.where(total > 0, dist[rows, 1 - cluster] / np.maximum(total, 1e-9), 0.5)
+        return cluster + 1, confidence
+    
     def assign_team_color(self, frame, player_detections):
         """Assign team colors based on first frame"""
-        player_colors = []
-        
-        for track_id, player in player_detections.items():
-            bbox = player["bbox"]
-            color = self.get_player_color(frame, bbox)
-            if color is not None:
-                player_colors.append(color)
+        bboxes = [player["bbox"] for player in player_detections.values()]
+        colors = self.get_player_colors(frame, bboxes)
+        player_colors = colors[~np.isnan(colors).any(axis=1)]
         
         if len(player_colors) < 2:
             self.team_colors[1] = np.array([255, 0, 0])
             self.team_colors[2] = np.array([0, 0, 255])
             return
         
-        kmeans = KMeans(n_clusters=2, init='k-means++', n_init=10)
-        kmeans.fit(player_colors)
-        
-        self.kmeans = kmeans
-        self.team_colors[1] = kmeans.cluster_centers_[0]
-        self.team_colors[2] = kmeans.cluster_centers_[1]
+        self.fit_team_colors(player_colors)
     
     def get_player_team(self, frame, bbox, player_id):
         """Get team assignment for a player"""
@@ -72,12 +189,135 @@ class TeamAssigner:
         if player_color is None:
             return 1
         
-        if self.kmeans is None:
+        if self.team_centers is None:
             return 1
         
-        team_id = self.kmeans.predict(player_color.reshape(1, -1))[0]
-        team_id = int(team_id) + 1
+        team_ids, _ = self.predict_teams(player_color)
+        team_id = int(team_ids[0])
         
         self.player_team_dict[player_id] = team_id
         
-        return team_id
\ No newline at end of file
+        return team_id
+    
+    def get_player_teams(self, frame, player_detections):
+        """Get team assignments for every player in a frame
+        
+        Colors are only extracted for track ids not seen before, and all of
+        those are handled in one batched call.
+        """
+        new_ids = [pid for pid in player_detections if pid not in self.player_team_dict]
+        
+        if new_ids and self.team_centers is not None:
+            bboxes = [player_detections[pid]["bbox"] for pid in new_ids]
+            colors = self.get_player_colors(frame, bboxes)
+            valid = ~np.isnan(colors).any(axis=1)
+            if valid.any():
+                valid_ids = [pid for pid, ok in zip(new_ids, valid) if ok]
+                team_ids, _ = self.predict_teams(colors[valid])
+                for pid, team_id in zip(valid_ids, team_ids):
+                    self.player_team_dict[pid] = int(team_id)
+        
+        return {pid: self.player_team_dict.get(pid, 1) for pid in player_detections}
+    
+    def _needs_vote(self, player_id):
+        state = self.player_state.get(player_id)
+        if state is None or state["votes"].sum() == 0:
+            return True
+        if self._track_confidence(state) >= self.min_confidence:
+            return False
+        return self.frame_num - state["last_vote"] >= self.revote_every
+    
+    def _track_confidence(self, state):
+        votes = state["votes"]
+        total = votes.sum()
+        return float(votes.max() / total) if total > 0 else 0.0
+    
+    def _evict_stale_players(self):
+        # player_state is ordered by last_seen, so stale tracks sit at the front
+        cutoff = self.frame_num - self.max_missing_frames
+        while self.player_state:
+            player_id, state = next(iter(self.player_state.items()))
+            if state["last_seen"] >= cutoff:
+                break
+            del self.player_state[player_id]
+            self.player_team_dict.pop(player_id, None)
+    
+    def _extract_colors(self, frame, player_detections, player_ids):
+        """Batched jersey colors for player_ids, dropping empty crops"""
+        if not player_ids:
+            return [], np.empty((0, 3))
+        bboxes = [player_detections[pid]["bbox"] for pid in player_ids]
+        colors = self.get_player_colors(frame, bboxes)
+        valid = ~np.isnan(colors).any(axis=1)
+        return [pid for pid, ok in zip(player_ids, valid) if ok], colors[valid]
+    
+    def _add_votes(self, player_ids, colors):
+        team_ids, confidence = self.predict_teams(colors)
+        for pid, team_id, conf in zip(player_ids, team_ids, confidence):
+            state = self.player_state[pid]
+            state["votes"][team_id - 1] += conf
+            state["votes"][2 - team_id] += 1 - conf
+            state["last_vote"] = self.frame_num
+    
+    def update(self, frame, player_detections):
+        """Online team assignment for one frame
+        
+        Returns {track_id: (team_id, confidence)}. Tracks without a vote
+        yet, e.g. every track during warmup, are (0, 0.0): unassigned, for
+        consumers to skip. Jersey colors are only extracted for tracks that
+        are new or still uncertain (and for every player during warmup, to
+        collect samples for the first fit).
+        """
+        self.frame_num += 1
+        
+        for player_id in player_detections:
+            state = self.player_state.get(player_id)
+            if state is None:
+                state = {"votes": np.zeros(2), "last_seen": self.frame_num, "last_vote": self.frame_num}
+                self.player_state[player_id] = state
+            state["last_seen"] = self.frame_num
+            self.player_state.move_to_end(player_id)
+        
+        if self.frame_num <= self.warmup_frames:
+            vote_ids = list(player_detections)
+        else:
+            vote_ids = [pid for pid in player_detections if self._needs_vote(pid)]
+        vote_ids, colors = self._extract_colors(frame, player_detections, vote_ids)
+        self.color_samples.extend(colors)
+        
+        if self.last_fit_frame is None:
+            fit_due = self.frame_num >= self.warmup_frames
+        else:
+            fit_due = self.frame_num - self.last_fit_frame >= self.refit_every
+        
+        if fit_due and len(self.color_samples) >= 2:
+            self.fit_team_colors(np.array(self.color_samples))
+            self.last_fit_frame = self.frame_num
+            
+            # Colors moved: every live track votes again under the new model
+            for state in self.player_state.values():
+                state["votes"][:] = 0
+            voted = set(vote_ids)
+            extra_ids, extra_colors = self._extract_colors(
+                frame, player_detections, [pid for pid in player_detections if pid not in voted]
+            )
+            vote_ids = vote_ids + extra_ids
+            colors = np.concatenate([colors, extra_colors])
+        
+        if self.team_centers is not None and vote_ids:
+            self._add_votes(vote_ids, colors)
+        
+        self._evict_stale_players()
+        return self._current_assignments(player_detections)
+    
+    def _current_assignments(self, player_detections):
+        assignments = {}
+        for player_id in player_detections:
+            state = self.player_state[player_id]
+            if state["votes"].sum() == 0:
+                assignments[player_id] = (self.player_team_dict.get(player_id, 0), 0.0)
+                continue
+            team_id = int(state["votes"].argmax()) + 1
+            self.player_team_dict[player_id] = team_id
+            assignments[player_id] = (team_id, self._track_confidence(state))
+        return assignments
\ No newline at end of file
@@ -0,0 +1,31 @@
+import numpy as np
+
+from analytics import MatchAnalytics
+
+
+def test_max_intervals_bounds_the_series_not_the_totals():
+    analytics = MatchAnalytics(fps=10, interval_seconds=1.0, max_intervals=3)
+    for frame_num in range(100):
+        analytics.add_frame(np.array([1, 2]), [1, 2], np.array([5.0, 6.0]), np.array([0.1, 0.2]) * frame_num)
+        analytics.add_possession(1)
+    analytics.finish()
+
+    result = analytics.as_dict()
+    assert [row["t"] for row in result["possession_series"]] == [7.0, 8.0, 9.0]
+    assert sorted({row["t"] for row in result["player_series"]}) == [7.0, 8.0, 9.0]
+    assert len(result["player_series"]) == 6
+    assert result["players"]["1"]["frames"] == 100
+    assert result["players"]["2"]["distance_m"] == 19.8
+
+
+def test_unassigned_team_is_not_counted():
+    analytics = MatchAnalytics(fps=2, interval_seconds=1.0)
+    for team in (0, 0, 2, 2, 2):
+        analytics.add_frame(np.array([7]), [team], np.array([1.0]), np.array([0.0]))
+        analytics.add_possession(team or None)
+    analytics.finish()
+
+    result = analytics.as_dict()
+    assert result["players"]["7"]["team"] == 2
+    assert [row["team"] for row in result["player_series"]] == [None, 2, 2]
+    assert [row["possession"] for row in result["possession_series"]] == [{}, {"2": 100.0}, {"2": 100.0}]
@@ -0,0 +1,118 @@
+import functools
+
+import pytest
+
+from benchmarks.synthetic import SyntheticMatch, FakeDetector
+from pipeline.segments import match_tracks, merge_segment_results, plan_segments, team_mapping
+
+
+def test_plan_segments_covers_the_clip_without_gaps():
+    assert plan_segments(100, 3) == [(0, 33), (33, 66), (66, 100)]
+    assert plan_segments(100, 4, min_segment_frames=40) == [(0, 50), (50, 100)]
+    assert plan_segments(10, 4, min_segment_frames=40) == [(0, 10)]
+    assert plan_segments(0, 4) == []
+
+
+def test_match_tracks_joins_overlapping_boxes_best_first():
+    tail = [{1: [0, 0, 10, 20], 2: [50, 0, 60, 20]}, {1: [1, 0, 11, 20], 2: [51, 0, 61, 20]}]
+    # Same players under new ids; 9 sits between them and matches neither well
+    head = [{7: [0, 0, 10, 20], 8: [50, 0, 60, 20], 9: [30, 0, 40, 20]},
+            {7: [1, 0, 11, 20], 8: [52, 0, 62, 20], 9: [30, 0, 40, 20]}]
+    assert match_tracks(tail, head) == {7: 1, 8: 2}
+    # Tracks must share at least min_frames frames
+    assert match_tracks(tail, [{}, {7: [1, 0, 11, 20]}], min_frames=2) == {}
+
+
+def test_team_mapping_swaps_reversed_kits_only():
+    reference = {"1": [40, 40, 200], "2": [200, 60, 40]}
+    assert team_mapping(reference, {"1": [45, 42, 190], "2": [190, 70, 50]}) == {}
+    assert team_mapping(reference, {"1": [190, 70, 50], "2": [45, 42, 190]}) == {"1": "2", "2": "1"}
+    assert team_mapping(reference, {}) == {}
+
+
+def segment_result(start, end, head, tail, distances, colors, counts):
+    return {
+        "segment": {"start_frame": start, "end_frame": end, "warmup_frames": len(head), "head": head,
+                    "tail": tail, "team_colors": colors, "player_distances": distances},
+        "possession": {"frame_counts": counts},
+    }
+
+
+def test_merge_segment_results_joins_ids_and_aligns_teams():
+    kits = {"1": [40, 40, 200], "2": [200, 60, 40]}
+    boundary = [{"3": [0, 0, 10, 20], "4": [50, 0, 60, 20]}]
+    results = [
+        segment_result(0, 100, [], boundary, {"3": 10.0, "4": 5.0}, kits, {"1": 60, "2": 40}),
+        # Track 1 continues 3, track 2 is a new player; kits came out reversed
+        segment_result(100, 200, [{"1": [0, 0, 10, 20], "2": [200, 0, 210, 20]}], [],
+                       {"1": 2.5, "2": 4.0}, {"1": kits["2"], "2": kits["1"]}, {"1": 30, "2": 70}),
+    ]
+    merged = merge_segment_results(results, "output.avi")
+    assert merged["player_distances"] == {"3": 12.5, "4": 5.0, "5": 4.0}
+    assert merged["possession"]["frame_counts"] == {"1": 130, "2": 70}
+    assert merged["possession"]["percentages"] == {"1": 65.0, "2": 35.0}
+    assert [(s["tracks_joined"], s["team_swapped"]) for s in merged["segments"]] == [(0, False), (1, True)]
+
+
+def run_segments(process_fn, input_path, output_path, num_segments, overlap_frames, **options):
+    """The per-segment runs of process_video_segmented, in-process and in order"""
+    total_frames = options.pop("total_frames")
+    return [
+        process_fn(input_path, f"{output_path}.part{k}.avi", start_frame=start, end_frame=end,
+                   overlap_frames=overlap_frames, **options)
+        for k, (start, end) in enumerate(plan_segments(total_frames, num_segments))
+    ]
+
+
+def test_segmented_distances_match_serial_on_a_panning_clip(tmp_path):
+    """Later segments start from the serial run's camera offset, so pitch distances agree"""
+    pytest.importorskip("supervision")
+    from main import process_video_optimized
+
+    match = SyntheticMatch(num_players=12, num_frames=240, seed=1)
+    assert match.pan.max() - match.pan.min() > 100
+    input_path = match.write_video(str(tmp_path / "input.avi"))
+    options = dict(model=FakeDetector(), cache_dir=None, analytics_only=True)
+
+    serial = process_video_optimized(input_path, str(tmp_path / "serial.avi"), start_frame=0,
+                                     end_frame=match.num_frames, **options)
+    results = run_segments(process_video_optimized, input_path, str(tmp_path / "out"), 3, 40,
+                           total_frames=match.num_frames, **options)
+    assert all(result.get("error") is None for result in [serial] + results)
+    merged = merge_segment_results(results, None)
+
+    expected = serial["segment"]["player_distances"]
+    got = merged["player_distances"]
+    assert sum(got.values()) == pytest.approx(sum(expected.values()), rel=0.02)
+    # Tracks that start inside a later segment get fresh global ids; the
+    # ones joined across the boundaries must keep the serial distance
+    agree = [track_id for track_id, distance in expected.items()
+             if got.get(track_id) == pytest.approx(distance, rel=0.02)]
+    assert len(agree) >= len(expected) // 2
+
+
+def test_segmented_parquet_is_joined_into_one_table(tmp_path):
+    """Per-segment tables become one <base>_analytics.parquet in global ids; the parts are removed"""
+    pytest.importorskip("supervision")
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    from main import process_video_optimized
+    from pipeline import process_video_segmented
+
+    match = SyntheticMatch(num_players=8, num_frames=150, seed=2)
+    input_path = match.write_video(str(tmp_path / "input.avi"))
+    # A partial is picklable, so the spawned workers get the fake detector too
+    process_fn = functools.partial(process_video_optimized, model=FakeDetector())
+    result = process_video_segmented(process_fn, input_path, str(tmp_path / "output.avi"), max_workers=2,
+                                     overlap_seconds=1.0, min_segment_seconds=1.0, analytics_only=True,
+                                     analytics_format="parquet")
+    assert result.get("error") is None
+    assert result["parallel"]["segments"] == 2
+    assert result["analytics_url"] == "output_analytics.parquet"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["input.avi", "output_analytics.parquet"]
+
+    table = pd.read_parquet(tmp_path / result["analytics_url"])
+    assert table["t"].is_monotonic_increasing
+    assert table["t"].max() > (match.num_frames - 25) / 25 - 1
+    track_ids = set(table["track_id"].dropna().astype(int))
+    assert set(map(int, result["player_distances"])) <= track_ids
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from benchmarks.synthetic import SyntheticMatch, TEAM_KITS
+from team_assigner import TeamAssigner
+
+
+def test_players_are_unassigned_until_the_first_fit():
+    match = SyntheticMatch(num_players=10, num_frames=12)
+    assigner = TeamAssigner(warmup_frames=5)
+    for frame_num in range(match.num_frames):
+        players = {pid: {"bbox": p["bbox"]} for pid, p in match.frame_tracks(frame_num)["players"][0].items()
+                   if p["bbox"][0] >= 0 and p["bbox"][2] <= match.frame_size[0]}
+        teams = assigner.update(match.frame(frame_num), players)
+        if frame_num < 4:
+            assert set(teams.values()) == {(0, 0.0)}
+    assert all(team in (1, 2) and confidence > 0 for team, confidence in teams.values())
+    fitted = sorted(tuple(np.round(color)) for color in assigner.team_colors.values())
+    assert fitted == sorted(TEAM_KITS.values())
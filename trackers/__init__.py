@@ -1 +1,7 @@
-from .tracker import Tracker
\ No newline at end of file
+from .tracker import Tracker
+from .track_store import TrackStore
+from .box_propagation import BoxPropagator
+from .ball_detector import BallDetector
+from .track_io import TrackFormatError, save_track_store, load_track_store, save_camera_movement, load_camera_movement
+from .ball_interpolation import interpolate_ball_bboxes, StreamingBallInterpolator
+from .model_registry import ModelRegistry, model_registry
\ No newline at end of file
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class BallDetector:
+    """Ball-focused detection on full-resolution crops
+
+    At 640x360 the ball is a few pixels wide and often missed. When the
+    main pass misses it, this runs a small inference on a roi_size crop of
+    the source frame around the predicted ball position. Only after the
+    ball has been lost for full_scan_after frames does it tile the whole
+    source frame, and then only every full_scan_every frames.
+    """
+
+    def __init__(self, model, frame_size=(640, 360), roi_size=320, tile_size=640,
+                 tile_overlap=0.2, conf=0.05, full_scan_after=15, full_scan_every=10):
+        self.model = model
+        self.frame_size = frame_size
+        self.roi_size = roi_size
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.conf = conf
+        self.full_scan_after = full_scan_after
+        self.full_scan_every = full_scan_every
+
+        self.last_center = None  # source-frame pixels
+        self.velocity = np.zeros(2)
+        # Never seen yet counts as lost long enough for a full scan
+        self.lost_frames = full_scan_after
+        self.stats = {"roi_passes": 0, "roi_hits": 0, "full_scans": 0, "full_scan_hits": 0}
+
+    def _ball_classes(self, names):
+        return [k for k, v in names.items() if v in ("ball", "sports ball")]
+
+    def _best_ball(self, results, origins):
+        """Highest-confidence ball box over crop results, in source coordinates"""
+        best, best_conf = None, -1.0
+        for result, (x0, y0) in zip(results, origins):
+            ball_classes = self._ball_classes(result.names)
+            if not ball_classes or len(result.boxes) == 0:
+                continue
+            cls = result.boxes.cls.cpu().numpy()
+            conf = result.boxes.conf.cpu().numpy()
+            xyxy = result.boxes.xyxy.cpu().numpy()
+            rows = np.flatnonzero(np.isin(cls, ball_classes))
+            if len(rows) == 0:
+                continue
+            row = rows[np.argmax(conf[rows])]
+            if conf[row] > best_conf:
+                best_conf = conf[row]
+                best = xyxy[row] + np.array([x0, y0, x0, y0], dtype=np.float32)
+        return best
+
+    def _window(self, center, size, width, height):
+        """Origin of a size x size window around center, kept inside the frame"""
+        x0 = int(np.clip(center[0] - size / 2, 0, max(width - size, 0)))
+        y0 = int(np.clip(center[1] - size / 2, 0, max(height - size, 0)))
+        return x0, y0
+
+    def _tile_origins(self, width, height):
+        step = max(int(self.tile_size * (1 - self.tile_overlap)), 1)
+        xs = list(range(0, max(width - self.tile_size, 0) + 1, step))
+        ys = list(range(0, max(height - self.tile_size, 0) + 1, step))
+        # Make sure the right and bottom edges are covered
+        if xs[-1] + self.tile_size < width:
+            xs.append(width - self.tile_size)
+        if ys[-1] + self.tile_size < height:
+            ys.append(height - self.tile_size)
+        return [(x, y) for y in ys for x in xs]
+
+    def _predict(self, source_frame, origins, size):
+        crops = [source_frame[y0:y0 + size, x0:x0 + size] for x0, y0 in origins]
+        return self._best_ball(self.model.predict(crops, conf=self.conf, verbose=False), origins)
+
+    def _observe(self, center):
+        if self.last_center is not None and self.lost_frames < self.full_scan_after:
+            velocity = (center - self.last_center) / (self.lost_frames + 1)
+            self.velocity = 0.5 * velocity + 0.5 * self.velocity
+        else:
+            self.velocity = np.zeros(2)
+        self.last_center = center
+        self.lost_frames = 0
+
+    def update(self, source_frame, ball_bbox=None):
+        """Ball box for one frame, in frame_size coordinates, or None
+
+        ball_bbox is the main pass result; if present it is returned as-is
+        and only used to update the ball's predicted position.
+        """
+        height, width = source_frame.shape[:2]
+        scale = np.array([width / self.frame_size[0], height / self.frame_size[1]] * 2,
+                         dtype=np.float32)
+
+        if ball_bbox is not None:
+            source_bbox = np.asarray(ball_bbox, dtype=np.float32) * scale
+            self._observe((source_bbox[:2] + source_bbox[2:]) / 2)
+            return ball_bbox
+
+        found = None
+        if self.last_center is not None and self.lost_frames < self.full_scan_after:
+            predicted = self.last_center + self.velocity * (self.lost_frames + 1)
+            self.stats["roi_passes"] += 1
+            found = self._predict(source_frame, [self._window(predicted, self.roi_size, width, height)],
+                                  self.roi_size)
+            if found is not None:
+                self.stats["roi_hits"] += 1
+        elif (self.lost_frames - self.full_scan_after) % self.full_scan_every == 0:
+            self.stats["full_scans"] += 1
+            found = self._predict(source_frame, self._tile_origins(width, height), self.tile_size)
+            if found is not None:
+                self.stats["full_scan_hits"] += 1
+
+        if found is None:
+            self.lost_frames += 1
+            return None
+        self._observe((found[:2] + found[2:]) / 2)
+        return found / scale
@@ -0,0 +1,79 @@
+from collections import deque
+
+import numpy as np
+
+
+def interpolate_ball_bboxes(bboxes, max_gap=None):
+    """Fill missing ball boxes by linear interpolation in one vectorised pass
+
+    bboxes is (F, 4) with NaN rows where the ball was not detected. Gaps
+    before the first or after the last detection are left as NaN, and so
+    are gaps longer than max_gap frames. Returns (filled, was_filled mask).
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    missing = np.isnan(bboxes).any(axis=1)
+    known = np.flatnonzero(~missing)
+    filled = bboxes.copy()
+    if len(known) < 2 or not missing.any():
+        return filled, np.zeros(len(bboxes), dtype=bool)
+
+    frames = np.arange(len(bboxes))
+    for coord in range(4):
+        filled[:, coord] = np.interp(frames, known, bboxes[known, coord])
+
+    # Only interior gaps, and only those no longer than max_gap
+    fillable = missing & (frames > known[0]) & (frames < known[-1])
+    if max_gap is not None:
+        next_known = known[np.searchsorted(known, frames).clip(max=len(known) - 1)]
+        prev_known = known[(np.searchsorted(known, frames, side="right") - 1).clip(min=0)]
+        fillable &= (next_known - prev_known - 1) <= max_gap
+
+    filled[missing & ~fillable] = np.nan
+    return filled, fillable
+
+
+class StreamingBallInterpolator:
+    """Fill short ball gaps in a live stream with a fixed look-ahead latency
+
+    Frames with a detection are released at once. A frame without one is
+    held for up to `lookahead` frames; if the ball reappears in that time
+    the gap is filled linearly, otherwise the frame is released unfilled.
+    """
+
+    def __init__(self, lookahead=5):
+        self.lookahead = lookahead
+        self.pending = deque()      # payloads of frames with no ball yet
+        self.last_bbox = None       # last released detection
+        self.gap_broken = False     # part of the current gap was already released
+
+    def push(self, ball_bbox, payload):
+        """Add one frame; returns [(bbox or None, interpolated, payload), ...] ready to emit"""
+        ready = []
+        if ball_bbox is None:
+            self.pending.append(payload)
+            while len(self.pending) > self.lookahead:
+                ready.append((None, False, self.pending.popleft()))
+                self.gap_broken = True
+            return ready
+
+        ball_bbox = np.asarray(ball_bbox, dtype=np.float64)
+        gap = len(self.pending)
+        if gap > 0:
+            if self.last_bbox is not None and not self.gap_broken:
+                steps = np.arange(1, gap + 1)[:, None] / (gap + 1)
+                fills = self.last_bbox + (ball_bbox - self.last_bbox) * steps
+                ready.extend((fill, True, p) for fill, p in zip(fills, self.pending))
+            else:
+                ready.extend((None, False, p) for p in self.pending)
+            self.pending.clear()
+
+        ready.append((ball_bbox, False, payload))
+        self.last_bbox = ball_bbox
+        self.gap_broken = False
+        return ready
+
+    def flush(self):
+        """Release everything still held (end of stream)"""
+        ready = [(None, False, p) for p in self.pending]
+        self.pending.clear()
+        return ready
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class BoxPropagator:
+    """Constant-velocity motion model for frames that skip detection
+
+    observe() takes the tracked boxes of a detected frame and updates each
+    track's per-frame box velocity (smoothed); predict() extrapolates the
+    boxes of the last detected frame to a later frame.
+    """
+
+    def __init__(self, smoothing=0.5, max_age=60):
+        self.smoothing = smoothing
+        self.max_age = max_age
+        # track_id -> [bbox, velocity or None, last frame, class id]
+        self.tracks = {}
+        self.visible = []
+        self.last_frame = None
+
+    def reset(self):
+        self.tracks.clear()
+        self.visible = []
+        self.last_frame = None
+
+    def observe(self, frame_num, track_ids, class_ids, bboxes):
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        for track_id, class_id, bbox in zip(np.asarray(track_ids).tolist(),
+                                            np.asarray(class_ids).tolist(), bboxes):
+            state = self.tracks.get(track_id)
+            if state is None:
+                self.tracks[track_id] = [bbox.copy(), None, frame_num, class_id]
+                continue
+            gap = frame_num - state[2]
+            if gap > 0:
+                velocity = (bbox - state[0]) / gap
+                if state[1] is not None:
+                    velocity = self.smoothing * velocity + (1 - self.smoothing) * state[1]
+                state[1] = velocity
+            state[0] = bbox.copy()
+            state[2] = frame_num
+            state[3] = class_id
+
+        self.visible = np.asarray(track_ids).tolist()
+        self.last_frame = frame_num
+        if len(self.tracks) > 2 * max(len(self.visible), 1):
+            self.tracks = {
+                track_id: state for track_id, state in self.tracks.items()
+                if frame_num - state[2] <= self.max_age
+            }
+
+    def predict(self, frame_num):
+        """(track_ids, class_ids, bboxes) of the last detected frame, moved to frame_num"""
+        if self.last_frame is None or not self.visible:
+            return np.zeros(0, np.int32), np.zeros(0, np.int8), np.zeros((0, 4), np.float32)
+        ahead = frame_num - self.last_frame
+        states = [self.tracks[track_id] for track_id in self.visible]
+        bboxes = np.array([
+            state[0] if state[1] is None else state[0] + state[1] * ahead for state in states
+        ], dtype=np.float32)
+        class_ids = np.array([state[3] for state in states], dtype=np.int8)
+        return np.array(self.visible, dtype=np.int32), class_ids, bboxes
+
+    def drift(self, frames_ahead):
+        """Largest predicted displacement after frames_ahead, in box heights
+
+        A cheap uncertainty measure: once a box would move by a sizeable
+        fraction of itself, extrapolation is no longer trustworthy.
+        """
+        worst = 0.0
+        for track_id in self.visible:
+            bbox, velocity, _, _ = self.tracks[track_id]
+            if velocity is None:
+                continue
+            center_speed = np.hypot((velocity[0] + velocity[2]) / 2, (velocity[1] + velocity[3]) / 2)
+            height = max(float(bbox[3] - bbox[1]), 1.0)
+            worst = max(worst, float(center_speed) * frames_ahead / height)
+        return worst
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import numpy as np
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded, warmed-up YOLO models
+
+    Each (weights, slot) pair is loaded exactly once. Callers that run
+    inference concurrently (one per pool worker) ask for distinct slots;
+    everyone else shares slot 0.
+    """
+
+    def __init__(self, warmup_size=(640, 360)):
+        self.warmup_size = warmup_size
+        self._models = {}
+        self._info = {}
+        self._expected = set()  # (weights, slot) pairs that must be warm to be ready
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _warm_up(self, model):
+        # First inference pays for lazy init (fuse, allocations); do it off the request path
+        width, height = self.warmup_size
+        model.predict(np.zeros((height, width, 3), dtype=np.uint8), conf=0.1, verbose=False)
+
+    def get(self, weights, slot=0):
+        """Loaded and warmed model for weights, loading it on first use"""
+        key = (weights, slot)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            info = {"weights": weights, "slot": slot, "state": "loading"}
+            self._info[key] = info
+            try:
+                from ultralytics.models import YOLO
+                t0 = time.perf_counter()
+                model = YOLO(weights)
+                info["load_seconds"] = round(time.perf_counter() - t0, 3)
+                t0 = time.perf_counter()
+                self._warm_up(model)
+                info["warmup_seconds"] = round(time.perf_counter() - t0, 3)
+            except Exception as e:
+                info["state"] = "error"
+                info["error"] = str(e)
+                raise
+            info["state"] = "ready"
+            self._models[key] = model
+        return model
+
+    def expect(self, weights, slots=(0,)):
+        """Declare the slots that must be loaded and warm before status() is ready"""
+        with self._lock:
+            self._expected.update((weights, slot) for slot in slots)
+
+    def preload(self, weights, slots=(0,)):
+        """Load and warm weights for every slot now instead of on first use"""
+        slots = list(slots)
+        self.expect(weights, slots)
+        for slot in slots:
+            self.get(weights, slot)
+
+    def status(self):
+        """Readiness report: ready once every expected slot is warm and nothing failed
+
+        Without expected slots, at least one model must be loaded, so an
+        empty registry is never ready.
+        """
+        with self._lock:
+            expected = set(self._expected) or set(self._info)
+        infos = [dict(info) for info in self._info.values()]
+        warm = {(info["weights"], info["slot"]) for info in infos if info["state"] == "ready"}
+        return {
+            "ready": bool(expected) and expected <= warm and all(info["state"] == "ready" for info in infos),
+            "expected_slots": len(expected),
+            "warm_slots": len(warm),
+            "models": infos,
+        }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .track_store import TrackStore
+
+TRACK_FORMAT = "football-tracks"
+TRACK_FORMAT_VERSION = 1
+
+
+class TrackFormatError(ValueError):
+    """A track/camera file is missing, of the wrong kind, or of another version"""
+
+
+def save_arrays(path, kind, arrays, meta=None):
+    """Write arrays as .npy files plus a JSON header into directory path
+
+    The directory is written next to path and renamed into place, so a
+    reader never sees a partial file set.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    header = {
+        "format": TRACK_FORMAT,
+        "version": TRACK_FORMAT_VERSION,
+        "kind": kind,
+        "arrays": {},
+    }
+    header.update(meta or {})
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array, allow_pickle=False)
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+    with open(os.path.join(tmp_path, "header.json"), "w") as f:
+        json.dump(header, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+
+
+def read_header(path, kind):
+    """Load and validate a header; raises TrackFormatError on any mismatch"""
+    header_path = os.path.join(path, "header.json")
+    if os.path.isfile(path):
+        raise TrackFormatError(f"{path} is a single file, not a {TRACK_FORMAT} directory "
+                               "(old pickle stub?); delete it to regenerate")
+    try:
+        with open(header_path) as f:
+            header = json.load(f)
+    except ValueError as e:
+        raise TrackFormatError(f"{header_path}: unreadable header ({e})")
+
+    if header.get("format") != TRACK_FORMAT:
+        raise TrackFormatError(f"{path}: format {header.get('format')!r}, expected {TRACK_FORMAT!r}")
+    if header.get("version") != TRACK_FORMAT_VERSION:
+        raise TrackFormatError(f"{path}: version {header.get('version')}, "
+                               f"this code reads version {TRACK_FORMAT_VERSION}")
+    if header.get("kind") != kind:
+        raise TrackFormatError(f"{path}: holds {header.get('kind')!r}, expected {kind!r}")
+    return header
+
+
+def load_arrays(path, kind, mmap=True):
+    """Validated header plus arrays; memory-mapped (zero-copy) by default
+
+    mmap may also be a numpy mmap mode, e.g. "c" for copy-on-write maps
+    that can be written without touching the file.
+    """
+    header = read_header(path, kind)
+    mmap_mode = mmap if isinstance(mmap, str) else ("r" if mmap else None)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise TrackFormatError(f"{path}/{name}.npy: {array.dtype.str}{list(array.shape)} "
+                                   f"does not match header {spec['dtype']}{spec['shape']}")
+        arrays[name] = array
+    return header, arrays
+
+
+def save_track_columns(path, frame_offsets, columns, camera_movement=None, first_frame=0):
+    """Save per-row track columns (names from TrackStore.COLUMNS) and frame offsets"""
+    arrays = {"frame_offsets": np.asarray(frame_offsets, dtype=np.int64)}
+    for name, values in columns.items():
+        dtype, shape, _ = TrackStore.COLUMNS[name]
+        arrays[name] = np.asarray(values, dtype=dtype).reshape((-1,) + shape)
+    if camera_movement is not None:
+        # float64 like CameraMovement, so a replay is bit-identical to the run
+        arrays["camera_movement"] = np.asarray(camera_movement, dtype=np.float64).reshape(-1, 2)
+    save_arrays(path, "tracks", arrays, {
+        "num_frames": len(frame_offsets) - 1,
+        "first_frame": first_frame,
+    })
+
+
+def load_track_columns(path, start=None, end=None, mmap=True):
+    """Columns for frames [start, end) as zero-copy slices
+
+    Returns (frame_offsets rebased to 0, {name: array}, camera_movement or
+    None, first_frame).
+    """
+    header, arrays = load_arrays(path, "tracks", mmap=mmap)
+    first_frame = header["first_frame"]
+    num_frames = header["num_frames"]
+    start = first_frame if start is None else start
+    end = first_frame + num_frames if end is None else end
+    if start < first_frame or end > first_frame + num_frames or start > end:
+        raise IndexError(f"Frames [{start}, {end}) outside stored "
+                         f"[{first_frame}, {first_frame + num_frames})")
+
+    offsets = arrays.pop("frame_offsets")[start - first_frame:end - first_frame + 1]
+    rows = slice(int(offsets[0]), int(offsets[-1]))
+    camera_movement = arrays.pop("camera_movement", None)
+    if camera_movement is not None:
+        camera_movement = camera_movement[start - first_frame:end - first_frame]
+    columns = {name: array[rows] for name, array in arrays.items()}
+    return np.asarray(offsets) - offsets[0], columns, camera_movement, start
+
+
+def save_track_store(path, store, camera_movement=None):
+    """Save every stored frame of a TrackStore"""
+    rows = slice(0, len(store))
+    columns = {name: store.columns[name][rows] for name in TrackStore.COLUMNS if name != "frame"}
+    save_track_columns(path, store.frame_offsets, columns, camera_movement, store.first_frame)
+
+
+def load_track_store(path, start=None, end=None):
+    """Frames [start, end) as a TrackStore over the memory-mapped columns
+
+    Nothing is copied: the store wraps copy-on-write maps, so pages are
+    read on demand and later set_column() writes stay in memory.
+    """
+    offsets, columns, _, first_frame = load_track_columns(path, start, end, mmap="c")
+    return TrackStore.from_columns(offsets, columns, first_frame)
+
+
+def save_camera_movement(path, camera_movement):
+    save_arrays(path, "camera_movement", {
+        "camera_movement": np.asarray(camera_movement, dtype=np.float64).reshape(-1, 2)
+    })
+
+
+def load_camera_movement(path, start=None, end=None):
+    """Camera movement [[x, y], ...] for frames [start, end)"""
+    _, arrays = load_arrays(path, "camera_movement")
+    return arrays["camera_movement"][start:end].tolist()
@@ -0,0 +1,189 @@
+import numpy as np
+
+
+class TrackStore:
+    """Columnar, array-backed storage for tracked objects
+
+    One row per detection; rows of a frame are contiguous and frames are
+    appended in order. Buffers grow by doubling and are reused after
+    clear(), and the old nested-dict track shape is available through
+    frame_view() / to_tracks().
+    """
+
+    OBJECT_TYPES = ("players", "referees", "ball")
+    PLAYER, REFEREE, BALL = 0, 1, 2
+
+    # name -> (dtype, per-row shape, fill value for unset entries)
+    COLUMNS = {
+        "frame": (np.int32, (), -1),
+        "track_id": (np.int32, (), -1),
+        "class_id": (np.int8, (), -1),
+        "bbox": (np.float32, (4,), np.nan),
+        "position": (np.float32, (2,), np.nan),
+        "position_adjusted": (np.float32, (2,), np.nan),
+        "position_transformed": (np.float32, (2,), np.nan),
+        "team": (np.int8, (), 0),
+        "speed": (np.float32, (), np.nan),
+        "distance": (np.float32, (), np.nan),
+    }
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.frame_offsets = [0]
+        self.first_frame = 0
+        self.columns = {
+            name: np.full((capacity,) + shape, fill, dtype=dtype)
+            for name, (dtype, shape, fill) in self.COLUMNS.items()
+        }
+
+    @classmethod
+    def from_columns(cls, frame_offsets, columns, first_frame=0):
+        """Store around existing column arrays (e.g. memory-mapped), without copying them
+
+        Columns not given are filled in. The arrays are used as they are, so
+        writes go wherever they point (use copy-on-write maps for files);
+        appending past them reallocates like any full store.
+        """
+        store = cls(capacity=0)
+        store.frame_offsets = [int(offset) for offset in frame_offsets]
+        store.first_frame = first_frame
+        store.size = rows = store.frame_offsets[-1]
+        for name, (dtype, shape, fill) in cls.COLUMNS.items():
+            values = columns.get(name)
+            if values is None:
+                values = np.full((rows,) + shape, fill, dtype=dtype)
+            elif values.dtype != dtype or values.shape != (rows,) + shape:
+                raise ValueError(f"Column {name}: {values.dtype}{values.shape}, "
+                                 f"expected {np.dtype(dtype)}{(rows,) + shape}")
+            store.columns[name] = values
+        if "frame" not in columns:
+            store.columns["frame"][:] = np.repeat(
+                np.arange(first_frame, first_frame + store.num_frames, dtype=np.int32),
+                np.diff(store.frame_offsets)
+            )
+        return store
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def num_frames(self):
+        return len(self.frame_offsets) - 1
+
+    @property
+    def capacity(self):
+        return len(self.columns["frame"])
+
+    def nbytes(self):
+        """Bytes held by the column buffers"""
+        return sum(column.nbytes for column in self.columns.values())
+
+    def clear(self, first_frame=0):
+        """Drop all rows but keep the allocated buffers"""
+        self.size = 0
+        self.frame_offsets = [0]
+        self.first_frame = first_frame
+
+    def _reserve(self, rows):
+        needed = self.size + rows
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, 2 * self.capacity)
+        for name, (dtype, shape, fill) in self.COLUMNS.items():
+            grown = np.full((new_capacity,) + shape, fill, dtype=dtype)
+            grown[:self.size] = self.columns[name][:self.size]
+            self.columns[name] = grown
+
+    def append_frame(self, track_ids, class_ids, bboxes):
+        """Append one frame of detections; returns its frame number"""
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        count = len(bboxes)
+        self._reserve(count)
+        start, end = self.size, self.size + count
+        frame_num = self.first_frame + self.num_frames
+
+        for name, (dtype, shape, fill) in self.COLUMNS.items():
+            self.columns[name][start:end] = fill
+        self.columns["frame"][start:end] = frame_num
+        self.columns["track_id"][start:end] = track_ids
+        self.columns["class_id"][start:end] = class_ids
+        self.columns["bbox"][start:end] = bboxes
+        self.columns["position"][start:end, 0] = (bboxes[:, 0] + bboxes[:, 2]) / 2
+        self.columns["position"][start:end, 1] = (bboxes[:, 1] + bboxes[:, 3]) / 2
+
+        self.size = end
+        self.frame_offsets.append(end)
+        return frame_num
+
+    def frame_rows(self, frame_num):
+        """Row slice holding a frame"""
+        index = frame_num - self.first_frame
+        if index < 0 or index >= self.num_frames:
+            raise IndexError(f"Frame {frame_num} not in store")
+        return slice(self.frame_offsets[index], self.frame_offsets[index + 1])
+
+    def _rows(self, frame_num, object_type=None):
+        rows = self.frame_rows(frame_num)
+        if object_type is None:
+            return rows
+        class_id = self.OBJECT_TYPES.index(object_type)
+        return np.arange(rows.start, rows.stop)[self.columns["class_id"][rows] == class_id]
+
+    def column(self, name, frame_num, object_type=None):
+        """Values of a column for one frame (a view when object_type is None)"""
+        return self.columns[name][self._rows(frame_num, object_type)]
+
+    def set_column(self, name, frame_num, values, object_type=None):
+        self.columns[name][self._rows(frame_num, object_type)] = values
+
+    def adjust_positions(self, frame_num, camera_shift):
+        """position_adjusted = position - camera shift, for the whole frame"""
+        rows = self.frame_rows(frame_num)
+        self.columns["position_adjusted"][rows] = (
+            self.columns["position"][rows] - np.asarray(camera_shift, dtype=np.float32)
+        )
+
+    def transform_positions(self, frame_num, view_transformer, camera_shift=(0, 0)):
+        """Pitch coordinates for every row of a frame in one transform call"""
+        rows = self.frame_rows(frame_num)
+        self.columns["position_transformed"][rows] = view_transformer.transform_points(
+            self.columns["position"][rows], camera_shift
+        )
+
+    def frame_view(self, frame_num):
+        """One frame in the old {object_type: {track_id: {...}}} shape"""
+        rows = self.frame_rows(frame_num)
+        view = {object_type: {} for object_type in self.OBJECT_TYPES}
+        if rows.start == rows.stop:
+            return view
+
+        # One tolist() per column instead of one per box
+        values = {name: self.columns[name][rows].tolist() for name in self.COLUMNS}
+        for i, (track_id, class_id) in enumerate(zip(values["track_id"], values["class_id"])):
+            entry = {"bbox": values["bbox"][i], "position": tuple(values["position"][i])}
+            for name in ("position_adjusted", "position_transformed"):
+                if values[name][i][0] == values[name][i][0]:  # not NaN
+                    entry[name] = tuple(values[name][i])
+            if values["team"][i]:
+                entry["team"] = values["team"][i]
+            for name in ("speed", "distance"):
+                if values[name][i] == values[name][i]:
+                    entry[name] = values[name][i]
+            view[self.OBJECT_TYPES[class_id]][track_id] = entry
+        return view
+
+    def to_tracks(self, start=None, end=None):
+        """Frames [start, end) as {object_type: [frame dicts]}"""
+        start = self.first_frame if start is None else start
+        end = self.first_frame + self.num_frames if end is None else end
+        tracks = {object_type: [] for object_type in self.OBJECT_TYPES}
+        for frame_num in range(start, end):
+            view = self.frame_view(frame_num)
+            for object_type in self.OBJECT_TYPES:
+                tracks[object_type].append(view[object_type])
+        return tracks
+
+    def frame_tracks(self, frame_num):
+        """Single-frame tracks dict (lists of length 1), as the per-frame stages expect"""
+        view = self.frame_view(frame_num)
+        return {object_type: [view[object_type]] for object_type in self.OBJECT_TYPES}
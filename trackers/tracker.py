@@ -1,100 +1,235 @@
-import ultralytics
 import supervision as sv
-import pickle
+import time
 import numpy as np
 import cv2
-from ultralytics.models import YOLO
+
+from .track_store import TrackStore
+from .track_io import save_track_store, load_track_store
+from .box_propagation import BoxPropagator
+from .ball_interpolation import interpolate_ball_bboxes
 
 
 class Tracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, batch_size=20, detect_every=1, adaptive=False,
+                 camera_threshold=3.0, drift_threshold=0.5, ball_detector=None):
+        # Accept an already-loaded model (or anything with YOLO's predict(),
+        # e.g. the benchmarks' fake detector) so callers can share one instance;
+        # ultralytics is only imported when weights have to be loaded here
+        if isinstance(model_path, str):
+            from ultralytics.models import YOLO
+            model_path = YOLO(model_path)
+        self.model = model_path
         self.tracker = sv.ByteTrack()
+        self.batch_size = batch_size
+        
+        # Frame skipping: YOLO runs every detect_every frames (in adaptive mode
+        # that is the longest gap, and a fast pan or drifting boxes trigger
+        # detection earlier); BoxPropagator fills the frames in between
+        self.detect_every = max(1, int(detect_every))
+        self.adaptive = adaptive
+        self.camera_threshold = camera_threshold
+        self.drift_threshold = drift_threshold
+        self.propagator = BoxPropagator()
+        self.frames_seen = 0
+        self.frames_detected = 0
+        self._since_detection = None
+        
+        # Optional full-resolution ball pass (BallDetector) for frames where
+        # the main pass missed the ball; needs source_frames
+        self.ball_detector = ball_detector
+        
+        # Optional pipeline.Profiler: yolo / bytetrack / ball_roi timings
+        self.profiler = None
         
     def detect_frames(self, frame_generator):
         """Detect objects in frames from a generator"""
-        batch_size = 20
+        batch_size = self.batch_size
         detections = []
         frames_batch = []
         
         for frame in frame_generator:
             frames_batch.append(frame)
             if len(frames_batch) == batch_size:
-                detections.extend(self.model.predict(frames_batch, conf=0.1))
+                detections.extend(self._predict(frames_batch))
                 frames_batch = []
         if frames_batch: # Process remaining frames
-            detections.extend(self.model.predict(frames_batch, conf=0.1))
+            detections.extend(self._predict(frames_batch))
 
         return detections
     
-    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
-        """Get tracked objects from frames"""
+    def _predict(self, frames_batch):
+        t0 = time.perf_counter()
+        detections = self.model.predict(frames_batch, conf=0.1)
+        self._record("yolo", t0, len(frames_batch))
+        return detections
+    
+    def _record(self, stage, t0, items=1):
+        if self.profiler is not None:
+            self.profiler.record(stage, time.perf_counter() - t0, items)
+    
+    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None, frame_range=None,
+                          as_store=False):
+        """Get tracked objects from frames
+        
+        Stubs use the versioned format in track_io; frame_range=(start, end)
+        loads only part of a stub. A stub from another format version raises
+        TrackFormatError instead of being silently recomputed. as_store=True
+        returns the TrackStore itself (for stubs, zero-copy over the
+        memory-mapped file) instead of building per-frame dicts.
+        """
         
         if read_from_stub and stub_path:
             try:
-                with open(stub_path, 'rb') as f:
-                    return pickle.load(f)
-            except:
+                start, end = frame_range or (None, None)
+                store = load_track_store(stub_path, start, end)
+                return store if as_store else store.to_tracks()
+            except FileNotFoundError:
                 pass
         
-        tracks = {
-            "players": [],
-            "referees": [],
-            "ball": []
+        store = self.get_object_track_store(frames)
+        
+        if stub_path:
+            save_track_store(stub_path, store)
+        
+        return store if as_store else store.to_tracks()
+    
+    def get_object_track_store(self, frames, store=None, camera_shifts=None, source_frames=None):
+        """Detect and track objects, appending one row per object to a TrackStore
+        
+        camera_shifts (per-frame [dx, dy]) lets adaptive frame skipping
+        detect again as soon as the camera pans quickly. source_frames are
+        the full-resolution frames the ball detector crops from.
+        """
+        if store is None:
+            store = TrackStore()
+        
+        if self.detect_every == 1:
+            # Micro-batched inference; ByteTrack below still sees frames in order
+            for i, detection in enumerate(self.detect_frames(frames)):
+                store.append_frame(*self._track_detection(detection, source_frames, i))
+                self.frames_seen += 1
+                self.frames_detected += 1
+            return store
+        
+        frames = list(frames)
+        schedule = self._schedule(len(frames), camera_shifts)
+        # Detected frames are still inferred as one micro-batch
+        detections = iter(self.detect_frames(f for f, detect in zip(frames, schedule) if detect))
+        
+        for i, detect in enumerate(schedule):
+            if detect:
+                track_ids, class_ids, bboxes = self._track_detection(next(detections), source_frames, i)
+                carried = class_ids != TrackStore.BALL
+                self.propagator.observe(self.frames_seen, track_ids[carried],
+                                        class_ids[carried], bboxes[carried])
+                self.frames_detected += 1
+            else:
+                # Let ByteTrack's Kalman filter step through the gap too, so
+                # it matches the next detections against predicted boxes.
+                # The ball is left missing for the ball interpolator to fill.
+                self.tracker.update_with_detections(sv.Detections.empty())
+                track_ids, class_ids, bboxes = self.propagator.predict(self.frames_seen)
+            store.append_frame(track_ids, class_ids, bboxes)
+            self.frames_seen += 1
+        
+        return store
+    
+    def _schedule(self, num_frames, camera_shifts=None):
+        """Which of the next num_frames frames get a detector pass
+        
+        Decided up front so detected frames can be batched; the drift test
+        uses track velocities as of the last detection before this batch.
+        """
+        schedule = []
+        since = self._since_detection
+        for i in range(num_frames):
+            detect = since is None or since + 1 >= self.detect_every
+            if not detect and self.adaptive:
+                if camera_shifts is not None and np.hypot(*camera_shifts[i]) > self.camera_threshold:
+                    detect = True
+                elif self.propagator.drift(since + 1) > self.drift_threshold:
+                    detect = True
+            since = 0 if detect else since + 1
+            schedule.append(detect)
+        self._since_detection = since
+        return schedule
+    
+    def detection_stats(self):
+        """How many frames went through the detector"""
+        return {
+            "frames": self.frames_seen,
+            "detected_frames": self.frames_detected,
+            "detection_rate": round(self.frames_detected / self.frames_seen, 4) if self.frames_seen else None,
+            "detect_every": self.detect_every,
+            "adaptive": self.adaptive,
+            "ball_detector": dict(self.ball_detector.stats) if self.ball_detector is not None else None,
         }
+    
+    def _track_detection(self, detection, source_frames=None, index=0):
+        """Run ByteTrack on one YOLO result; returns (track_ids, class_ids, bboxes)"""
+        cls_names = detection.names
+        cls_names_inv = {v: k for k, v in cls_names.items()}
+        # Use 'person' instead of 'player' for YOLO models
+        player_cls = cls_names_inv.get("person", cls_names_inv.get("player", -1))
+        referee_cls = cls_names_inv.get("referee", -1)
+        ball_cls = cls_names_inv.get("ball", cls_names_inv.get("sports ball", -1))
         
-        detections = []
-        for frame in frames:
-            detections.extend(self.model.predict([frame], conf=0.1))
-
-        for frame_num, detection in enumerate(detections):
-            cls_names = detection.names
-            cls_names_inv = {v: k for k, v in cls_names.items()}
-            
-            # Convert to supervision format
-            detection_supervision = sv.Detections.from_ultralytics(detection)
-            
-            # Track objects
-            detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
-            
-            tracks["players"].append({})
-            tracks["referees"].append({})
-            tracks["ball"].append({})
-            
-            for frame_detection in detection_with_tracks:
-                bbox = frame_detection[0].tolist()
-                cls_id = frame_detection[3]
-                track_id = frame_detection[4]
-                
-                # Use 'person' instead of 'player' for YOLO models
-                if cls_id == cls_names_inv.get("person", cls_names_inv.get("player", -1)):
-                    tracks["players"][frame_num][track_id] = {"bbox": bbox}
-                
-                if cls_id == cls_names_inv.get("referee", -1):
-                    tracks["referees"][frame_num][track_id] = {"bbox": bbox}
-                    
-            # Handle ball detection separately
-            for frame_detection in detection_supervision:
-                bbox = frame_detection[0].tolist()
-                cls_id = frame_detection[3]
-                
-                if cls_id == cls_names_inv.get("ball", cls_names_inv.get("sports ball", -1)):
-                    tracks["ball"][frame_num][1] = {"bbox": bbox}
+        # Convert to supervision format
+        detection_supervision = sv.Detections.from_ultralytics(detection)
         
-        if stub_path:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(tracks, f)
+        # Track objects
+        t0 = time.perf_counter()
+        detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
+        self._record("bytetrack", t0)
+        
+        tracked_cls = detection_with_tracks.class_id
+        is_player = tracked_cls == player_cls
+        is_referee = tracked_cls == referee_cls
+        keep = is_player | is_referee
         
-        return tracks
+        track_ids = [detection_with_tracks.tracker_id[keep]]
+        class_ids = [np.where(is_player[keep], TrackStore.PLAYER, TrackStore.REFEREE)]
+        bboxes = [detection_with_tracks.xyxy[keep]]
+        
+        # Ball is taken from raw detections (untracked), always track id 1
+        ball_rows = np.flatnonzero(detection_supervision.class_id == ball_cls)
+        ball_bbox = detection_supervision.xyxy[ball_rows[-1]] if len(ball_rows) > 0 else None
+        if self.ball_detector is not None and source_frames is not None:
+            t0 = time.perf_counter()
+            ball_bbox = self.ball_detector.update(source_frames[index], ball_bbox)
+            self._record("ball_roi", t0)
+        if ball_bbox is not None:
+            track_ids.append([1])
+            class_ids.append([TrackStore.BALL])
+            bboxes.append(np.reshape(ball_bbox, (1, 4)))
+        
+        return np.concatenate(track_ids), np.concatenate(class_ids), np.concatenate(bboxes)
     
-    def draw_annotations(self, frames, tracks, team_ball_possession, specific_frame_num=None):
-        """Draw bounding boxes and annotations on frames"""
+    @staticmethod
+    def draw_annotations(frames, tracks, team_ball_possession, specific_frame_num=None, in_place=False):
+        """Draw bounding boxes and annotations on frames
+        
+        team_ball_possession is either a TeamBallPossession accumulator
+        (streaming: its current totals are drawn) or a per-frame sequence
+        of team ids (offline: running totals are computed in one pass).
+        in_place=True draws on the given frames instead of copies.
+        """
         output_frames = []
         
         start_frame = specific_frame_num if specific_frame_num is not None else 0
+        
+        possession_counter = None
+        if hasattr(team_ball_possession, "percentages"):
+            possession_counter = team_ball_possession
+        else:
+            possession = np.asarray(team_ball_possession)
+            team_1_running = np.cumsum(possession == 1)
+            team_2_running = np.cumsum(possession == 2)
+        
         for i, frame in enumerate(frames):
             frame_num = start_frame + i
-            frame = frame.copy()
+            if not in_place:
+                frame = frame.copy()
             
             player_dict = tracks["players"][frame_num]
             referee_dict = tracks["referees"][frame_num]
@@ -123,11 +258,18 @@ class Tracker:
                 cv2.circle(frame, (int((x1+x2)/2), int((y1+y2)/2)), 10, (0, 0, 255), -1)
             
             # Draw possession stats
-            if frame_num < len(team_ball_possession):
-                possession = team_ball_possession[:frame_num+1]
-                team_1_poss = np.sum(np.array(possession) == 1) / len(possession) * 100
-                team_2_poss = np.sum(np.array(possession) == 2) / len(possession) * 100
-                
+            team_1_poss = team_2_poss = None
+            if possession_counter is not None:
+                if len(possession_counter) > 0:
+                    windowed = possession_counter.window is not None
+                    percentages = possession_counter.percentages(windowed=windowed)
+                    team_1_poss = percentages.get(1, 0.0)
+                    team_2_poss = percentages.get(2, 0.0)
+            elif frame_num < len(possession):
+                team_1_poss = team_1_running[frame_num] / (frame_num + 1) * 100
+                team_2_poss = team_2_running[frame_num] / (frame_num + 1) * 100
+            
+            if team_1_poss is not None:
                 cv2.putText(frame, f"Team 1: {team_1_poss:.1f}%", (50, 50),
                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 3)
                 cv2.putText(frame, f"Team 2: {team_2_poss:.1f}%", (50, 100),
@@ -137,39 +279,19 @@ class Tracker:
         
         return output_frames
     
-    def ball_interpolation(self, ball_positions):
+    def ball_interpolation(self, ball_positions, max_gap=None):
         """Interpolate missing ball positions"""
-        ball_positions_filled = [{1: pos[1]} if 1 in pos else {} 
-                                for pos in ball_positions]
-        
-        df_ball = []
-        for pos in ball_positions_filled:
-            df_ball.append(pos.get(1, {}).get("bbox", [None]*4))
-        
-        df_ball = np.array(df_ball)
-        
-        # Simple linear interpolation
-        for i in range(len(df_ball)):
-            if all(x is None for x in df_ball[i]):
-                # Find previous and next valid positions
-                prev_idx = i - 1
-                while prev_idx >= 0 and all(x is None for x in df_ball[prev_idx]):
-                    prev_idx -= 1
-                
-                next_idx = i + 1
-                while next_idx < len(df_ball) and all(x is None for x in df_ball[next_idx]):
-                    next_idx += 1
-                
-                if prev_idx >= 0 and next_idx < len(df_ball):
-                    # Interpolate
-                    alpha = (i - prev_idx) / (next_idx - prev_idx)
-                    df_ball[i] = (1 - alpha) * np.array(df_ball[prev_idx]) + \
-                                alpha * np.array(df_ball[next_idx])
+        df_ball = np.full((len(ball_positions), 4), np.nan)
+        for i, pos in enumerate(ball_positions):
+            bbox = pos.get(1, {}).get("bbox")
+            if bbox is not None:
+                df_ball[i] = bbox
+        
+        df_ball, was_filled = interpolate_ball_bboxes(df_ball, max_gap=max_gap)
         
         # Update ball positions
-        for i, bbox in enumerate(df_ball):
-            if not all(x is None for x in bbox):
-                ball_positions[i][1] = {"bbox": bbox.tolist()}
+        for i in np.flatnonzero(was_filled):
+            ball_positions[i][1] = {"bbox": df_ball[i].tolist()}
         
         return ball_positions
     
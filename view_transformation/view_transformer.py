@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+
+class ViewTransformer:
+    """Map image points to pitch coordinates in metres via a homography"""
+
+    def __init__(self, pixel_vertices=None, target_vertices=None, frame_size=(640, 360),
+                 recompute_threshold=2.0):
+        if pixel_vertices is None:
+            # Visible pitch section in a 1920x1080 broadcast frame, scaled to frame_size
+            pixel_vertices = np.array([[110, 1035], [265, 275], [910, 260], [1640, 915]], dtype=np.float32)
+            pixel_vertices *= np.array([frame_size[0] / 1920, frame_size[1] / 1080], dtype=np.float32)
+        if target_vertices is None:
+            court_width = 68
+            court_length = 23.32
+            target_vertices = np.array([
+                [0, court_width],
+                [0, 0],
+                [court_length, 0],
+                [court_length, court_width]
+            ], dtype=np.float32)
+
+        self.pixel_vertices = np.asarray(pixel_vertices, dtype=np.float32)
+        self.target_vertices = np.asarray(target_vertices, dtype=np.float32)
+
+        # Homography is cached and only rebuilt once the accumulated camera
+        # shift has drifted more than recompute_threshold pixels
+        self.recompute_threshold = recompute_threshold
+        self.homography = None
+        self.homography_shift = np.zeros(2)
+        self.recompute_count = 0
+
+    def get_homography(self, camera_shift=(0, 0)):
+        """Homography for a frame whose camera has moved by camera_shift pixels"""
+        camera_shift = np.asarray(camera_shift, dtype=np.float64)
+        if (self.homography is None or
+                np.abs(camera_shift - self.homography_shift).max() > self.recompute_threshold):
+            # Pitch landmarks move with the image content
+            shifted = self.pixel_vertices + camera_shift.astype(np.float32)
+            self.homography = cv2.getPerspectiveTransform(shifted, self.target_vertices)
+            self.homography_shift = camera_shift.copy()
+            self.recompute_count += 1
+        return self.homography
+
+    def transform_points(self, points, camera_shift=(0, 0)):
+        """Transform an (N, 2) array of image points in one call"""
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+        if len(points) == 0:
+            return np.empty((0, 2), dtype=np.float32)
+        return cv2.perspectiveTransform(points, self.get_homography(camera_shift)).reshape(-1, 2)
+
+    def add_transformed_position_to_tracks(self, tracks, frame_num=0, camera_shift=(0, 0)):
+        """Add position_transformed (metres) to every track in one frame"""
+        entries = []
+        positions = []
+        for object_type, object_tracks in tracks.items():
+            if frame_num >= len(object_tracks):
+                continue
+            for track_id, track in object_tracks[frame_num].items():
+                position = track.get("position")
+                if position is None:
+                    continue
+                entries.append(track)
+                positions.append(position)
+
+        transformed = self.transform_points(positions, camera_shift)
+        for track, point in zip(entries, transformed):
+            track["position_transformed"] = (float(point[0]), float(point[1]))